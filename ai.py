@@ -2,28 +2,128 @@ import numpy as np
 import random
 import time
 
+from stats import SearchStats
+from threats import ThreatSearch
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+class SearchTimeout(Exception):
+    """搜索超过硬截止时间时抛出，用于立即退出递归"""
+
+
 class AI:
-    def __init__(self, game, difficulty=3):
+    # 已用时间超过 time_limit 的这个比例后不再开始新一轮迭代（软截止）
+    SOFT_TIME_RATIO = 0.4
+    # 威胁空间搜索（进攻和防守合计）最多使用 time_limit 的这个比例
+    THREAT_TIME_RATIO = 0.25
+    # 后台思考命中后，至少还继续搜索 time_limit 的这个比例
+    PONDER_MIN_RATIO = 0.25
+    
+    def __init__(self, game, difficulty=3, time_limit=None, max_depth=None, tt_size_mb=8,
+                 dynamic_ordering=True, threat_search=None, threat_nodes=20000, book=None,
+                 player=2, max_nodes=None, collect_stats=False, stats_callback=None):
         self.game = game
+        self.player = player  # AI执子，默认白子(2)
+        self.opponent = 3 - player
         self.difficulty = difficulty  # 1-3，3为最高难度
-        self.max_depth = {1: 2, 2: 4, 3: 6}[difficulty]  # 根据难度设置搜索深度
-        self.time_limit = {1: 0.5, 2: 1.5, 3: 3}[difficulty]  # 思考时间限制(秒)
+        # 迭代加深的最大深度（含AI自己这一步），高难度主要由时间预算决定
+        self.max_depth = max_depth or {1: 3, 2: 5, 3: 12}[difficulty]
+        # 思考时间预算(秒)，同时也是硬截止时间
+        self.time_limit = time_limit or {1: 0.5, 2: 1.5, 3: 3}[difficulty]
+        # 全宽搜索的节点上限，配合很长的 time_limit 可得到可复现的搜索结果
+        self.max_nodes = max_nodes or float('inf')
+        # 置换表，同一局内跨回合复用
+        self.tt = TranspositionTable(tt_size_mb, game.board_size * game.board_size)
+        self._hard_deadline = float('inf')
+        self._soft_deadline = float('inf')
+        self._search_start = 0.0
+        # 后台思考（ponder）时不计时，直到调用 ponder_hit()；由调用方在搜索开始前设置
+        self.pondering = False
+        # 由其他线程调用 stop() 置为 True 后，搜索会尽快返回；再次搜索前需由调用方清除
+        self.stopped = False
+        self._threat_search = None
+        
+        # 动态走法排序：置换表走法 > 杀手走法 > 历史得分，静态评分只用于打破平局
+        self.dynamic_ordering = dynamic_ordering
+        self.killers = []  # 每层两个杀手走法
+        # 按玩家和格子编号累计的历史得分，只保存出现过剪枝的格子（稀疏棋盘也适用）
+        self.history_table = [None, {}, {}]
+        self._root_ply = 0
+        
+        # 全宽搜索之前的威胁空间搜索：None/False 关闭，'vcf' 只用冲四，'vct' 同时使用活三
+        if threat_search is None:
+            threat_search = {1: None, 2: 'vcf', 3: 'vct'}[difficulty]
+        self.threat_search = threat_search
+        self.threat_nodes = threat_nodes  # 每次威胁搜索的节点上限
+        self.book = book  # 开局库（book.OpeningBook），None 表示不使用
+        
+        # 最近一次搜索的结果
+        self.nodes = 0          # 搜索节点数
+        self.depth_reached = 0  # 完成的最大深度
+        self.best_score = 0     # 最佳走法的分数
+        self.pv = []            # 主要变例 [(x, y), ...]
+        # 每轮完成的迭代 (深度, 最佳移动, 分数, 分数是否精确, 累计用时)
+        self.iterations = []
+        
+        # 多进程并行搜索时各进程共享的根节点 alpha，按深度索引（见 parallel.py）
+        self.shared_alpha = None
+        
+        # 搜索统计（stats.SearchStats），关闭时为 None，可以随时替换；stats_callback(stats)
+        # 在每轮迭代完成和选定走法后调用（在搜索所在的线程中），设置它时自动收集统计。
+        # 后台思考的局面是假设的，思考期间不回调，命中后由 ponder_hit() 补上
+        self.stats = SearchStats() if collect_stats or stats_callback else None
+        self.stats_callback = stats_callback
+    
+    def reset(self):
+        """新开一局时清空置换表和历史得分"""
+        self.tt.clear()
+        for player in (1, 2):
+            self.history_table[player].clear()
+    
+    def stop(self):
+        """请求正在进行的搜索尽快结束（可以从其他线程调用）"""
+        self.stopped = True
+        search = self._threat_search
+        if search is not None:
+            search.stopped = True
+    
+    def ponder_hit(self):
+        """对手下出了后台思考时预测的走法，后台思考转为计时搜索
+        
+        已经思考的时间计入本次预算，但至少再留出 PONDER_MIN_RATIO 的时间。
+        后台思考期间没有回调的统计在这里补发一次。
+        """
+        self.pondering = False
+        now = time.time()
+        self._set_deadlines(max(self._search_start,
+                                now - self.time_limit * (1 - self.PONDER_MIN_RATIO)))
+        stats = self.stats
+        callback = self.stats_callback
+        if stats is not None and callback is not None:
+            callback(stats)
+    
+    def _set_deadlines(self, start_time):
+        self._hard_deadline = start_time + self.time_limit
+        self._soft_deadline = start_time + self.time_limit * self.SOFT_TIME_RATIO
     
     def make_move(self):
         """AI决策并返回最佳移动"""
         start_time = time.time()
+        self.nodes = 0
+        self.depth_reached = 0
+        self.pv = []
+        if self.stats is not None:
+            self.stats.reset()
         
-        # 获取有效移动
-        valid_moves = self._get_heuristic_moves()
-        
-        if not valid_moves:
-            # 如果没有启发式移动，则获取所有有效移动
-            valid_moves = self.game.get_valid_moves()
+        # 开局库中有这个局面（含对称局面）时直接使用
+        if self.book is not None:
+            move = self.book.probe(self.game)
+            if move is not None and self.game.is_valid_move(*move):
+                return self._report(move, 'book', start_time)
         
         # 如果是第一步，选择靠近中心的位置
         if len(self.game.history) == 0:
             center = self.game.board_size // 2
-            return (center, center)
+            return self._report((center, center), 'opening', start_time)
         
         # 如果是第二步，选择靠近玩家棋子的位置
         if len(self.game.history) == 1:
@@ -39,99 +139,377 @@ class AI:
                         candidates.append((nx, ny))
             
             if candidates:
-                return random.choice(candidates)
+                return self._report(random.choice(candidates), 'opening', start_time)
+        
+        return self.search()
+    
+    def search(self):
+        """不使用开局库和开局规则，直接搜索当前局面的最佳移动"""
+        start_time = time.time()
+        self.nodes = 0
+        self.depth_reached = 0
+        self.pv = []
+        self._threat_search = None
+        if self.stats is not None:
+            self.stats.reset()
         
-        # 初始化最佳移动和分数
+        # 获取有效移动
+        root_moves = self._get_heuristic_moves()
+        
+        if not root_moves:
+            # 如果没有启发式移动，则获取所有有效移动
+            root_moves = self.game.get_valid_moves()
+        
+        # 成五、挡四以及 VCF/VCT 必胜序列不需要全宽搜索
+        move, root_moves = self._threat_move(root_moves)
+        if move is not None:
+            return self._report(move, 'threat', start_time)
+        
+        move = self._iterative_deepening(root_moves, start_time)
+        return self._report(move, 'search', start_time)
+    
+    def _report(self, move, source, start_time):
+        """记录最终选出的走法并调用统计回调，返回 move"""
+        stats = self.stats
+        if stats is not None:
+            stats.source = source
+            stats.move = move
+            stats.pv = list(self.pv)
+            stats.depth = self.depth_reached
+            stats.score = self.best_score if source == 'search' else 0
+            stats.nodes = self.nodes
+            stats.elapsed = time.time() - start_time
+            if self._threat_search is not None:
+                stats.threat_nodes = self._threat_search.total_nodes
+            callback = self.stats_callback
+            if callback is not None and not self.pondering:
+                callback(stats)
+        return move
+    
+    def _threat_move(self, root_moves):
+        """在全宽搜索之前处理直接成五、挡四和强制取胜序列
+        
+        返回 (move, root_moves)。move 不为 None 时直接落子；否则 root_moves 是
+        交给全宽搜索的走法，对手有必胜序列时只保留能破解它的走法。
+        """
+        game = self.game
+        wins = game.get_threat_moves(self.player, 4)
+        if wins:
+            return min(wins), root_moves
+        blocks = game.get_threat_moves(self.opponent, 4)
+        if blocks:
+            return min(blocks), root_moves
+        if not self.threat_search:
+            return None, root_moves
+        
+        modes = (False, True) if self.threat_search == 'vct' else (False,)
+        # 每次 find_win 各有一份预算：进攻和寻找对手必胜序列各 len(modes) 次，
+        # 检验防守走法的循环合计一份，总用时不超过 THREAT_TIME_RATIO
+        budget = self.time_limit * self.THREAT_TIME_RATIO / (2 * len(modes) + 1)
+        search = ThreatSearch(game, self.threat_nodes, budget)
+        self._threat_search = search
+        search.stopped = self.stopped
+        
+        # 进攻：自己有必胜序列
+        for vct in modes:
+            line = search.find_win(self.player, vct)
+            if line:
+                self.pv = line
+                return line[0], root_moves
+        
+        # 防守：对手有必胜序列时，找出下完之后能让它失效的走法
+        for vct in modes:
+            line = search.find_win(self.opponent, vct)
+            if line:
+                break
+        else:
+            return None, root_moves
+        
+        candidates = list(root_moves)
+        for move in line[::2] + sorted(game.get_threat_moves(self.player, 3)):
+            if move not in candidates:
+                candidates.append(move)
+        search.time_limit = budget / len(candidates)
+        defences = []
+        for x, y in candidates:
+            if self.stopped:
+                break
+            game.make_move(x, y, self.player)
+            if not search.find_win(self.opponent, vct):
+                defences.append((x, y))
+            game.undo_move()
+        return None, defences or root_moves
+    
+    def _iterative_deepening(self, root_moves, start_time):
+        """迭代加深搜索，返回最后一轮完整搜索得到的最佳移动"""
+        self.tt.new_search()
+        self._search_start = start_time
+        if self.pondering:
+            self._hard_deadline = self._soft_deadline = float('inf')
+        else:
+            self._set_deadlines(start_time)
+        root_ply = len(self.game.history)
+        self._root_ply = root_ply
+        self.killers = [[None, None] for _ in range(self.max_depth + 1)]
+        self.iterations = []
+        # 历史得分减半，让之前回合的信息逐渐淡出
+        for player in (1, 2):
+            table = self.history_table[player]
+            self.history_table[player] = {index: value >> 1
+                                          for index, value in table.items() if value > 1}
+        
+        # 在第一轮搜索完成之前，以静态排序最好的走法兜底
+        best_move = root_moves[0]
+        
+        for depth in range(1, self.max_depth + 1):
+            try:
+                move, score, exact = self._search_root(depth, root_moves)
+            except SearchTimeout:
+                # 恢复被中断的搜索留下的落子
+                while len(self.game.history) > root_ply:
+                    self.game.undo_move()
+                break
+            
+            best_move = move
+            self.best_score = score
+            self.depth_reached = depth
+            self.pv = self._principal_variation(depth)
+            self.iterations.append((depth, move, score, exact, time.time() - start_time))
+            stats = self.stats
+            if stats is not None:
+                self._report_iteration(stats, start_time)
+            
+            # 上一轮的最佳走法在下一轮最先搜索
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+            
+            # 已经找到必胜或必败，无需更深的搜索
+            if score in (float('inf'), float('-inf')):
+                break
+            if time.time() >= self._soft_deadline:
+                break
+        
+        return best_move
+    
+    def _report_iteration(self, stats, start_time):
+        """把刚完成的一轮迭代记入统计并调用统计回调"""
+        depth, move, score, exact, elapsed = self.iterations[-1]
+        stats.iterations.append((depth, move, score, exact, self.nodes, elapsed))
+        stats.depth = depth
+        stats.move = move
+        stats.score = score
+        stats.pv = list(self.pv)
+        stats.nodes = self.nodes
+        stats.elapsed = time.time() - start_time
+        callback = self.stats_callback
+        if callback is not None and not self.pondering:
+            callback(stats)
+    
+    def _search_root(self, depth, root_moves):
+        """在根节点搜索指定深度，返回 (最佳移动, 分数, 分数是否精确)
+        
+        使用共享 alpha 时，其他进程已经找到更好的走法，本进程的分数可能只是上界。
+        """
         best_move = None
         best_score = float('-inf')
+        exact = False
         alpha = float('-inf')
         beta = float('inf')
+        shared = self.shared_alpha
         
         # 对每个可能的移动进行评估
-        for move in valid_moves:
+        for move in root_moves:
+            if shared is not None:
+                alpha = max(alpha, shared[depth])
             x, y = move
-            
-            # 模拟移动
-            self.game.make_move(x, y, 2)  # AI使用白子(2)
-            
-            # 使用极小极大算法评估移动
-            score = self._minimax(self.max_depth, False, alpha, beta, start_time)
-            
-            # 撤销移动
+            self.game.make_move(x, y, self.player)
+            score = self._minimax(depth - 1, False, alpha, beta)
             self.game.undo_move()
             
             # 更新最佳移动
-            if score > best_score:
+            if best_move is None or score > best_score:
                 best_score = score
                 best_move = move
+                exact = score > alpha or alpha == float('-inf')
             
             # Alpha-Beta剪枝
             alpha = max(alpha, best_score)
-            
-            # 如果超过时间限制，提前结束
-            if time.time() - start_time > self.time_limit:
-                break
-        
-        # 如果没有找到最佳移动，随机选择一个有效移动
-        if best_move is None and valid_moves:
-            best_move = random.choice(valid_moves)
+            if shared is not None and score > shared[depth]:
+                with shared.get_lock():
+                    shared[depth] = max(shared[depth], score)
         
-        return best_move
+        if exact:
+            x, y = best_move
+            self.tt.store(self.game.hash, depth, EXACT, best_score, y * self.game.board_size + x)
+        return best_move, best_score, exact
     
-    def _minimax(self, depth, is_maximizing, alpha, beta, start_time):
+    def _principal_variation(self, depth):
+        """沿置换表中的最佳走法取出主要变例"""
+        pv = []
+        player = self.player
+        for _ in range(depth):
+            entry = self.tt.probe(self.game.hash)
+            if entry is None or entry[3] < 0:
+                break
+            move = (entry[3] % self.game.board_size, entry[3] // self.game.board_size)
+            if not self.game.make_move(move[0], move[1], player):
+                break
+            pv.append(move)
+            player = 3 - player
+        for _ in pv:
+            self.game.undo_move()
+        return pv
+    
+    def _minimax(self, depth, is_maximizing, alpha, beta):
         """极小极大算法与Alpha-Beta剪枝"""
-        # 检查是否达到搜索深度或游戏结束
-        if depth == 0 or self.game.is_board_full():
-            return self._evaluate_board()
+        self.nodes += 1
+        stats = self.stats
         
         # 检查是否有玩家获胜
-        last_move = self.game.history[-1] if self.game.history else None
+        last_move = self.game.last_move()
         if last_move:
             x, y = last_move
-            player = self.game.board[y][x]
+            player = self.game.cells[y * self.game.board_size + x]
             if self.game.check_win(x, y, player):
-                return float('inf') if player == 2 else float('-inf')
+                return float('inf') if player == self.player else float('-inf')
         
-        # 检查是否超时
-        if time.time() - start_time > self.time_limit:
+        # 检查是否达到搜索深度或游戏结束
+        if depth == 0 or self.game.is_board_full():
+            if stats is not None:
+                stats.evaluations += 1
             return self._evaluate_board()
         
+        # 检查是否超过硬截止时间或被要求停止
+        if self.stopped or self.nodes > self.max_nodes or time.time() > self._hard_deadline:
+            raise SearchTimeout()
+        
+        # 查询置换表
+        key = self.game.hash
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.tt.probe(key)
+        if stats is not None:
+            stats.tt_probes += 1
+        if entry is not None:
+            tt_depth, flag, tt_score, move = entry
+            if stats is not None:
+                stats.tt_hits += 1
+            if tt_depth >= depth:
+                if flag == EXACT:
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return tt_score
+                elif flag == LOWER:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if beta <= alpha:
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return tt_score
+            if move >= 0:
+                tt_move = (move % self.game.board_size, move // self.game.board_size)
+        
         # 获取有效移动
         valid_moves = self._get_heuristic_moves()
         
         if not valid_moves:
             valid_moves = self.game.get_valid_moves()
         
+        ply = len(self.game.moves) - self._root_ply
+        valid_moves = self._order_moves(valid_moves, tt_move, ply,
+                                         self.player if is_maximizing else self.opponent)
+        
+        best_move = None
         if is_maximizing:
-            max_eval = float('-inf')
+            best_eval = float('-inf')
             for move in valid_moves:
                 x, y = move
-                self.game.make_move(x, y, 2)  # AI使用白子(2)
-                eval = self._minimax(depth - 1, False, alpha, beta, start_time)
+                self.game.make_move(x, y, self.player)  # AI落子
+                eval = self._minimax(depth - 1, False, alpha, beta)
                 self.game.undo_move()
-                max_eval = max(max_eval, eval)
+                if best_move is None or eval > best_eval:
+                    best_eval = eval
+                    best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self._record_cutoff(move, ply, self.player, depth)
+                    if stats is not None:
+                        stats.record_cutoff(valid_moves.index(move))
                     break  # Beta剪枝
-            return max_eval
         else:
-            min_eval = float('inf')
+            best_eval = float('inf')
             for move in valid_moves:
                 x, y = move
-                self.game.make_move(x, y, 1)  # 玩家使用黑子(1)
-                eval = self._minimax(depth - 1, True, alpha, beta, start_time)
+                self.game.make_move(x, y, self.opponent)  # 对手落子
+                eval = self._minimax(depth - 1, True, alpha, beta)
                 self.game.undo_move()
-                min_eval = min(min_eval, eval)
+                if best_move is None or eval < best_eval:
+                    best_eval = eval
+                    best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self._record_cutoff(move, ply, self.opponent, depth)
+                    if stats is not None:
+                        stats.record_cutoff(valid_moves.index(move))
                     break  # Alpha剪枝
-            return min_eval
+        
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        x, y = best_move
+        self.tt.store(key, depth, flag, best_eval, y * self.game.board_size + x)
+        return best_eval
+    
+    def _order_moves(self, moves, tt_move, ply, player):
+        """动态排序：置换表走法最先，其次是本层杀手走法，然后按历史得分
+        
+        moves 已按静态评分排好，排序是稳定的，因此静态评分只在得分相同时起作用。
+        """
+        if tt_move is not None and self.game.is_valid_move(*tt_move):
+            if tt_move in moves:
+                moves.remove(tt_move)
+        else:
+            tt_move = None
+        
+        if self.dynamic_ordering:
+            killers = self.killers[ply] if ply < len(self.killers) else ()
+            history = self.history_table[player]
+            size = self.game.board_size
+            
+            def priority(move):
+                if move in killers:
+                    return float('inf')
+                return history.get(move[1] * size + move[0], 0)
+            
+            moves.sort(key=priority, reverse=True)
+        
+        if tt_move is not None:
+            moves.insert(0, tt_move)
+        return moves
+    
+    def _record_cutoff(self, move, ply, player, depth):
+        """记录引起剪枝的走法：更新本层杀手走法和历史得分"""
+        if not self.dynamic_ordering:
+            return
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        x, y = move
+        table = self.history_table[player]
+        index = y * self.game.board_size + x
+        table[index] = table.get(index, 0) + depth * depth
     
     def _evaluate_board(self):
         """评估当前棋盘状态"""
         # 使用游戏类的评估函数
-        ai_score = self.game.evaluate_position(2)  # AI评分
-        player_score = self.game.evaluate_position(1)  # 玩家评分
+        ai_score = self.game.evaluate_position(self.player)  # AI评分
+        player_score = self.game.evaluate_position(self.opponent)  # 玩家评分
         
         # 在高难度下，更重视防守
         if self.difficulty == 3:
@@ -141,39 +519,16 @@ class AI:
     
     def _get_heuristic_moves(self):
         """获取启发式移动（靠近现有棋子的空位）"""
-        board = self.game.board
-        moves = []
-        
-        # 只考虑现有棋子周围2格范围内的空位
-        for y in range(self.game.board_size):
-            for x in range(self.game.board_size):
-                if board[y][x] != 0:  # 如果有棋子
-                    # 检查周围的空位
-                    for dy in range(-2, 3):
-                        for dx in range(-2, 3):
-                            nx, ny = x + dx, y + dy
-                            if (0 <= nx < self.game.board_size and 
-                                0 <= ny < self.game.board_size and 
-                                board[ny][nx] == 0 and
-                                (nx, ny) not in moves):
-                                moves.append((nx, ny))
-        
-        # 对移动进行评分和排序
+        # 只考虑现有棋子周围2格范围内的空位（由 Game 增量维护）
+        moves = self.game.get_candidate_moves()
+        
+        # 对移动进行评分和排序：只看经过该点的窗口，不做整盘评估
         scored_moves = []
         for move in moves:
-            x, y = move
-            # 模拟AI移动
-            self.game.make_move(x, y, 2)
-            ai_score = self.game.evaluate_position(2)
-            self.game.undo_move()
-            
-            # 模拟玩家移动
-            self.game.make_move(x, y, 1)
-            player_score = self.game.evaluate_position(1)
-            self.game.undo_move()
+            attack, defence = self.game.score_move_delta(move[0], move[1], self.player)
             
             # 综合评分（防守与进攻的平衡）
-            score = ai_score + player_score * 0.8
+            score = attack + defence * 0.8
             scored_moves.append((move, score))
         
         # 按评分降序排序
@@ -0,0 +1,379 @@
+"""五子棋引擎性能基准测试
+
+固定局面上的可复现基准：评估、胜负判断、走法生成和搜索的每秒调用次数，
+以及固定节点数下的搜索结果（每秒节点数、到达各深度的用时、选出的走法）。
+结果可以写成 JSON，并与保存的基线比较，超过阈值的退化会被标出。
+
+用法：
+    python benchmark.py                            # 运行基准并与基线比较
+    python benchmark.py --json out.json            # 同时把结果写入文件
+    python benchmark.py --save-baseline            # 把本次结果保存为基线
+    python benchmark.py compare                    # 各项优化前后的对比测试
+    python benchmark.py check                      # 不同实现之间的一致性检查
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from ai import AI
+from game import Game
+from parallel import ParallelAI
+from sparse import SparseGame
+
+
+# 固定的基准局面：(棋盘大小, 黑白交替的走法)
+POSITIONS = {
+    'opening': (15, '7,7 9,6 9,9 11,4'),
+    'middlegame': (15, '7,7 8,6 8,8 6,5 9,6 11,4 4,4 9,7 2,3 9,3 0,1 7,6 10,3 7,9 11,6 '
+                       '4,7 12,7 3,1 5,0 10,5 12,9 10,9 7,2 3,9'),
+    'endgame': (15, '7,7 6,6 6,8 4,6 7,10 5,11 8,4 5,8 8,3 9,5 6,2 5,5 3,8 2,10 4,1 3,1 '
+                    '7,2 7,13 1,7 2,11 6,1 3,2 11,6 5,14 4,3 3,14 6,12 6,0 2,12 1,12 0,12 '
+                    '2,2 4,14 8,5 10,1 13,8 9,11 9,1 1,4 1,8 6,13 8,8 2,7 11,8 2,0 7,11 '
+                    '9,10 3,0 8,14 2,14 2,6 12,6 0,10 7,6 11,3 3,11 3,10 12,10 10,2 12,8 '
+                    '2,9 0,11 9,8 1,13 6,5 10,4 10,11 10,12 0,14 8,9 8,0 7,5 11,9 4,2 12,3 '
+                    '7,12 0,5 3,5 9,13 9,3 0,7 8,13 13,6 5,12 0,8 8,11 13,10 4,5 12,11 4,7 '
+                    '14,4 2,3 0,1 6,3 6,9 4,13 14,11 11,2 3,9 13,0 10,14 12,13 4,8 11,7 '
+                    '9,6 5,0 10,10 14,7 0,3 5,7'),
+    '19x19': (19, '9,9 11,11 11,9 11,7 12,8 12,7 7,8 11,5 7,11 9,8 6,11 7,10 13,3 11,8 '
+                  '11,6 10,6 14,1 5,12 8,7 13,12 13,7 6,6 15,9 13,8 12,4 4,13 15,6 3,12 '
+                  '8,12 15,13'),
+}
+
+# 固定节点数搜索的节点上限
+SEARCH_NODES = 3000
+
+# 比较基线时的指标方向：吞吐量越大越好，用时越小越好
+HIGHER_IS_BETTER = ('calls_per_sec', 'nodes_per_sec')
+LOWER_IS_BETTER = ('depth_seconds',)
+# 短于这个时间(秒)的用时波动太大，不参与比较
+MIN_SECONDS = 0.02
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'benchmark_baseline.json')
+
+
+def load_position(name, game_class=Game):
+    """按名字创建固定的基准局面"""
+    board_size, moves = POSITIONS[name]
+    game = game_class(board_size)
+    for ply, move in enumerate(moves.split()):
+        x, y = (int(v) for v in move.split(','))
+        game.make_move(x, y, 1 + ply % 2)
+    return game
+
+
+def calls_per_sec(func, min_time=0.6):
+    """重复调用 func 至少 min_time 秒，取三次中最快的一次，返回每秒调用次数"""
+    best = 0
+    for _ in range(3):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / 3:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+def micro_benchmarks(name):
+    """单个局面上各热点函数的每秒调用次数"""
+    game = load_position(name)
+    player = 1 + len(game.history) % 2
+    ai = AI(game, difficulty=3, player=player, time_limit=1e9, threat_search=False,
+            tt_size_mb=0.25)
+    x, y = game.history[-1]
+    ex, ey = sorted(game.get_candidate_moves())[0]
+    
+    def make_undo():
+        game.make_move(ex, ey, player)
+        game.undo_move()
+    
+    def minimax():
+        ai.tt.clear()  # 每次都从空置换表开始，避免直接命中上一次的结果
+        ai._minimax(2, True, float('-inf'), float('inf'))
+    
+    cases = {
+        'evaluate_position': lambda: game.evaluate_position(player),
+        'evaluate_position_full': lambda: game.evaluate_position_full(player),
+        'check_win': lambda: game.check_win(x, y, 3 - player),
+        'make_undo': make_undo,
+        'score_move_delta': lambda: game.score_move_delta(ex, ey, player),
+        'get_heuristic_moves': ai._get_heuristic_moves,
+        'minimax_depth2': minimax,
+    }
+    return {case: {'calls_per_sec': calls_per_sec(func)} for case, func in cases.items()}
+
+
+def search_benchmark(name, max_nodes=SEARCH_NODES, repeat=3):
+    """固定节点数的迭代加深搜索：走法、深度、节点数都可复现，用时取最快的一次"""
+    game = load_position(name)
+    player = 1 + len(game.history) % 2
+    best = None
+    for _ in range(repeat):
+        random.seed(0)
+        ai = AI(game, difficulty=3, player=player, time_limit=1e9, max_nodes=max_nodes,
+                threat_search=False)
+        start = time.perf_counter()
+        move = ai.search()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, move, ai)
+    elapsed, move, ai = best
+    return {
+        'move': list(move),
+        'depth': ai.depth_reached,
+        'nodes': ai.nodes,
+        'nodes_per_sec': ai.nodes / elapsed,
+        'depth_seconds': {str(depth): seconds for depth, _, _, _, seconds in ai.iterations},
+    }
+
+
+def run_suite():
+    """运行全部基准，返回可以写成 JSON 的结果"""
+    results = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'search_nodes': SEARCH_NODES,
+        },
+        'micro': {},
+        'search': {},
+    }
+    for name in POSITIONS:
+        results['micro'][name] = micro_benchmarks(name)
+        results['search'][name] = search_benchmark(name)
+    return results
+
+
+def compare_results(current, baseline, threshold):
+    """与基线比较，返回 (退化列表, 变化列表)"""
+    regressions = []
+    changes = []
+    
+    def walk(cur, base, path):
+        for key, base_value in base.items():
+            if key not in cur:
+                continue
+            value = cur[key]
+            where = f"{path}.{key}" if path else key
+            if isinstance(base_value, dict):
+                walk(value, base_value, where)
+            elif key in HIGHER_IS_BETTER or path.endswith(LOWER_IS_BETTER):
+                lower_is_better = path.endswith(LOWER_IS_BETTER)
+                if lower_is_better and base_value < MIN_SECONDS:
+                    continue
+                ratio = value / base_value if base_value else 1.0
+                if (ratio < 1 - threshold) if not lower_is_better else (ratio > 1 + threshold):
+                    regressions.append(f"{where}: {base_value:.4g} -> {value:.4g} ({ratio - 1:+.0%})")
+            elif key in ('move', 'depth', 'nodes') and value != base_value:
+                changes.append(f"{where}: {base_value} -> {value}")
+    
+    walk(current, baseline, '')
+    return regressions, changes
+
+
+def print_suite(results):
+    for name, cases in results['micro'].items():
+        print(f"[{name}]")
+        for case, metrics in cases.items():
+            print(f"  {case:<24} {metrics['calls_per_sec']:>12.0f} 次/秒")
+        search = results['search'][name]
+        depths = ', '.join(f"d{d}={s * 1e3:.0f}ms" for d, s in search['depth_seconds'].items())
+        print(f"  搜索 {search['nodes']} 节点: 走法 {tuple(search['move'])}, 深度 {search['depth']}, "
+              f"{search['nodes_per_sec']:.0f} 节点/秒 ({depths})")
+
+
+def random_game(board_size, stones, seed=0):
+    """生成一个双方交替落子的随机局面"""
+    rnd = random.Random(seed)
+    game = Game(board_size)
+    cells = [(x, y) for y in range(board_size) for x in range(board_size)]
+    for i, (x, y) in enumerate(rnd.sample(cells, stones)):
+        game.make_move(x, y, 1 + i % 2)
+    return game
+
+
+def timeit(func, repeat):
+    """返回 func 平均每次调用耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_full_evaluation(board_size, stones, repeat=20):
+    """对比逐窗口循环评估与向量化评估"""
+    game = random_game(board_size, stones)
+    for player in (1, 2):
+        expected = game._evaluate_position_scan(player)
+        assert game.evaluate_position_full(player) == expected
+        assert game.evaluate_position(player) == expected
+    
+    scan = timeit(lambda: game._evaluate_position_scan(1), max(1, repeat // 10))
+    vectorized = timeit(lambda: game.evaluate_position_full(1), repeat * 10)
+    print(f"{board_size}x{board_size} 完整评估: 循环 {scan * 1e3:.2f} ms, "
+          f"向量化 {vectorized * 1e3:.3f} ms, 加速 {scan / vectorized:.0f}x")
+
+
+class ConsistencyError(Exception):
+    """两种实现的结果不一致"""
+
+
+def _expect_equal(name, step, expected, actual):
+    # 用显式的异常而不是 assert，python -O 下检查同样有效
+    if expected != actual:
+        raise ConsistencyError(f"第 {step} 步 {name} 不一致: Game {expected!r}, SparseGame {actual!r}")
+
+
+def check_sparse_game(board_size, steps=2000, seed=5):
+    """随机落子和悔棋，检查 SparseGame 与 Game 的增量状态始终一致，不一致时抛出 ConsistencyError
+    
+    两者分别实现了增量评估、威胁窗口和候选点，任何一方改动后都应运行
+    `python benchmark.py check`。
+    """
+    rnd = random.Random(seed)
+    game, sparse = Game(board_size), SparseGame(board_size)
+    for step in range(steps):
+        if game.moves and (rnd.random() < 0.45 or game.is_board_full()):
+            game.undo_move()
+            sparse.undo_move()
+        else:
+            x, y = rnd.choice(game.get_valid_moves())
+            player = 1 + len(game.history) % 2
+            _expect_equal(f"make_move{(x, y)}", step,
+                          game.make_move(x, y, player), sparse.make_move(x, y, player))
+        _expect_equal("candidates", step, game.candidates, sparse.candidates)
+        for player in (1, 2):
+            _expect_equal(f"evaluate_position({player})", step,
+                          game.evaluate_position(player), sparse.evaluate_position(player))
+        if step % 50:
+            continue
+        for player in (1, 2):
+            _expect_equal(f"evaluate_position_full({player})", step,
+                          game.evaluate_position_full(player), sparse.evaluate_position_full(player))
+            for stones in (2, 3, 4):
+                _expect_equal(f"get_threat_moves({player}, {stones})", step,
+                              game.get_threat_moves(player, stones),
+                              sparse.get_threat_moves(player, stones))
+        for x, y in game.history:
+            player = game.piece_at(x, y)
+            _expect_equal(f"check_win{(x, y)}", step,
+                          game.check_win(x, y, player), sparse.check_win(x, y, player))
+            _expect_equal(f"count_threat_windows{(x, y)}", step,
+                          game.count_threat_windows(x, y, player, 3),
+                          sparse.count_threat_windows(x, y, player, 3))
+        for x, y in game.get_candidate_moves():
+            _expect_equal(f"score_move_delta{(x, y)}", step,
+                          game.score_move_delta(x, y, 1), sparse.score_move_delta(x, y, 1))
+    
+    # 全部悔掉之后回到空棋盘
+    while sparse.moves:
+        sparse.undo_move()
+    _expect_equal("清空后的哈希", steps, 0, sparse.hash)
+    _expect_equal("清空后的候选点", steps, set(), sparse.candidates)
+    _expect_equal("清空后的评估", steps, 0, sparse.evaluate_position(1))
+    print(f"{board_size}x{board_size} SparseGame 与 Game 一致（{steps} 步随机落子和悔棋）")
+
+
+def run_checks():
+    """不同实现之间的一致性检查（不计时）"""
+    check_sparse_game(15)
+    check_sparse_game(9)
+
+
+def bench_move_ordering(depth=4, seeds=(1, 2, 3)):
+    """固定深度搜索，对比静态排序与动态排序（杀手/历史）的节点数"""
+    for dynamic in (False, True):
+        total_nodes = 0
+        start = time.perf_counter()
+        for seed in seeds:
+            game = random_game(15, 12, seed)
+            ai = AI(game, difficulty=3, time_limit=1e9, max_depth=depth,
+                    dynamic_ordering=dynamic)
+            ai.make_move()
+            total_nodes += ai.nodes
+        elapsed = time.perf_counter() - start
+        name = '动态排序' if dynamic else '静态排序'
+        print(f"{name} 深度{depth}: 节点 {total_nodes}, 用时 {elapsed:.2f} s")
+
+
+def bench_parallel(worker_counts=(1, 2, 4), depth=5, seed=2):
+    """固定深度的多进程根节点并行搜索：每秒节点数和相对单进程的加速比"""
+    base = None
+    for workers in worker_counts:
+        game = random_game(15, 12, seed)
+        ai = ParallelAI(game, workers=workers, difficulty=3, time_limit=1e9,
+                        max_depth=depth, threat_search=False)
+        ai.make_move()  # 预热：启动进程并载入模块
+        ai.reset()
+        start = time.perf_counter()
+        move = ai.make_move()
+        elapsed = time.perf_counter() - start
+        ai.close()
+        base = base or elapsed
+        print(f"{workers} 进程 深度{depth}: {elapsed:.2f} s, 节点 {ai.nodes}, "
+              f"{ai.nps:.0f} 节点/秒, 加速 {base / elapsed:.2f}x, 走法 {move}")
+
+
+def run_compare():
+    """各项优化前后的对比测试"""
+    bench_full_evaluation(15, 60)
+    bench_full_evaluation(19, 100)
+    bench_move_ordering()
+    bench_parallel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='五子棋引擎性能基准测试')
+    parser.add_argument('mode', nargs='?', choices=['suite', 'compare', 'check'],
+                        default='suite')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线 JSON 文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=0.3,
+                        help='吞吐量下降或用时增加超过这个比例时视为退化')
+    args = parser.parse_args()
+    
+    if args.mode == 'compare':
+        run_compare()
+        return
+    if args.mode == 'check':
+        try:
+            run_checks()
+        except ConsistencyError as error:
+            sys.exit(f"一致性检查失败: {error}")
+        return
+    
+    results = run_suite()
+    print_suite(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"基线已保存到 {args.baseline}")
+        return
+    
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions, changes = compare_results(results, baseline, args.threshold)
+        for line in changes:
+            print(f"结果变化: {line}")
+        for line in regressions:
+            print(f"性能退化: {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"与基线相比没有超过 {args.threshold:.0%} 的退化")
+
+
+if __name__ == '__main__':
+    main()
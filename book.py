@@ -0,0 +1,260 @@
+"""对称感知的开局库
+
+开局库是一个按局面键排序的二进制文件，运行时用 mmap 映射后二分查找，
+启动时不解析任何内容，也不把条目读入内存。局面键是棋盘8种对称变换下
+Zobrist 哈希的最小值，因此对称的局面只需要保存一次。
+
+文件格式（小端）：
+    文件头  magic(4s) version(H) board_size(H) max_ply(H) reserved(H) count(I)
+    条目    key(Q) move(H) score(h)，按 key 升序排列
+move 是规范局面（取到最小哈希的那个对称变换）中的格子编号 y * board_size + x。
+
+用法：
+    python book.py build [--plies 5] [--width 4] [--time 2] [--out opening_book.bin]
+    python book.py extend GAMES.txt [--plies 5] [--time 2] [--out opening_book.bin]
+GAMES.txt 每行一局，走法写成 "x,y x,y ..."，例如自对弈的结果。
+"""
+import argparse
+import mmap
+import os
+import struct
+from functools import lru_cache
+
+from game import Game, zobrist_keys
+from tables import prebuilt
+
+MAGIC = b'WZQB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHI')
+ENTRY = struct.Struct('<QHh')
+KEY = struct.Struct('<Q')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+
+@lru_cache(maxsize=None)
+@prebuilt
+def symmetry_maps(board_size):
+    """棋盘的8种对称变换，每种是格子编号到变换后格子编号的映射表"""
+    n = board_size - 1
+    transforms = [
+        lambda x, y: (x, y),
+        lambda x, y: (n - x, y),
+        lambda x, y: (x, n - y),
+        lambda x, y: (n - x, n - y),
+        lambda x, y: (y, x),
+        lambda x, y: (n - y, x),
+        lambda x, y: (y, n - x),
+        lambda x, y: (n - y, n - x),
+    ]
+    maps = []
+    for transform in transforms:
+        mapping = [0] * (board_size * board_size)
+        for y in range(board_size):
+            for x in range(board_size):
+                tx, ty = transform(x, y)
+                mapping[y * board_size + x] = ty * board_size + tx
+        maps.append(tuple(mapping))
+    return tuple(maps)
+
+
+@lru_cache(maxsize=None)
+@prebuilt
+def inverse_maps(board_size):
+    """symmetry_maps 中每种变换的逆映射"""
+    inverses = []
+    for mapping in symmetry_maps(board_size):
+        inverse = [0] * len(mapping)
+        for index, target in enumerate(mapping):
+            inverse[target] = index
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+
+def canonical_key(game):
+    """返回 (规范局面键, 对称变换编号)：8种对称变换下哈希的最小值"""
+    size = game.board_size
+    keys = zobrist_keys(size)
+    stones = [(index, game.cells[index]) for index in game.moves]
+    best = None
+    for t, mapping in enumerate(symmetry_maps(size)):
+        key = 0
+        for index, player in stones:
+            key ^= keys[player][mapping[index]]
+        if best is None or key < best[0]:
+            best = (key, t)
+    return best
+
+
+class OpeningBook:
+    """只读的内存映射开局库，probe 的复杂度为 O(log n)"""
+    
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.board_size, self.max_ply, _, self.count = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的开局库文件: {path}")
+    
+    @classmethod
+    def open_default(cls):
+        """打开随程序发布的开局库，文件不存在时返回 None"""
+        if os.path.exists(DEFAULT_PATH):
+            return cls(DEFAULT_PATH)
+        return None
+    
+    def close(self):
+        self._map.close()
+        self._file.close()
+    
+    def _find(self, key):
+        """二分查找局面键，返回条目序号，找不到时返回 -1"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = KEY.unpack_from(self._map, HEADER.size + mid * ENTRY.size)[0]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+    
+    def probe(self, game):
+        """查找当前局面的开局库走法，返回 (x, y) 或 None"""
+        if (game.board_size != self.board_size or not game.history or
+                len(game.history) > self.max_ply):
+            return None
+        key, t = canonical_key(game)
+        i = self._find(key)
+        if i < 0:
+            return None
+        _, move, _ = ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+        index = inverse_maps(self.board_size)[t][move]
+        return (index % self.board_size, index // self.board_size)
+    
+    def entries(self):
+        """依次返回所有条目 (key, move, score)"""
+        for i in range(self.count):
+            yield ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+
+
+def write_book(path, board_size, max_ply, entries):
+    """把 {key: (move, score)} 按键排序写成开局库文件"""
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, board_size, max_ply, 0, len(entries)))
+        for key in sorted(entries):
+            move, score = entries[key]
+            f.write(ENTRY.pack(key, move, max(-32768, min(32767, int(score)))))
+
+
+class BookBuilder:
+    """用 AI 搜索生成或扩充开局库（AI 执白，条目只记录白方走棋的局面）"""
+    
+    def __init__(self, board_size=15, max_ply=5, time_limit=2.0):
+        self.board_size = board_size
+        self.max_ply = max_ply
+        self.time_limit = time_limit
+        self.entries = {}
+    
+    def load(self, path):
+        """读入已有的开局库条目，用于扩充"""
+        book = OpeningBook(path)
+        self.entries.update((key, (move, score)) for key, move, score in book.entries())
+        self.max_ply = max(self.max_ply, book.max_ply)
+        book.close()
+    
+    def add_position(self, game):
+        """搜索白方走棋的局面并记录，已经有条目时直接返回库中的走法"""
+        from ai import AI
+        key, t = canonical_key(game)
+        if key in self.entries:
+            index = inverse_maps(self.board_size)[t][self.entries[key][0]]
+            return (index % self.board_size, index // self.board_size)
+        ai = AI(game, difficulty=3, time_limit=self.time_limit)
+        x, y = ai.search()
+        self.entries[key] = (symmetry_maps(self.board_size)[t][y * self.board_size + x],
+                             ai.best_score)
+        return (x, y)
+    
+    def build(self, width=4):
+        """从天元开局展开：白方走搜索得到的最佳走法，黑方走静态评分最高的 width 种应对"""
+        game = Game(self.board_size)
+        center = self.board_size // 2
+        game.make_move(center, center, 1)
+        self._expand(game, width)
+    
+    def _expand(self, game, width):
+        if len(game.history) > self.max_ply:
+            return
+        x, y = self.add_position(game)
+        game.make_move(x, y, 2)
+        if len(game.history) < self.max_ply:
+            replies = game.get_candidate_moves()
+            
+            def reply_score(move):
+                attack, defence = game.score_move_delta(move[0], move[1], 1)
+                return attack + defence * 0.8
+            
+            replies.sort(key=reply_score, reverse=True)
+            seen = set()
+            for bx, by in replies:
+                game.make_move(bx, by, 1)
+                key = canonical_key(game)[0]
+                if key not in seen:
+                    seen.add(key)
+                    self._expand(game, width)
+                game.undo_move()
+                if len(seen) >= width:
+                    break
+        game.undo_move()
+    
+    def extend(self, games):
+        """按给定对局（走法序列）中出现的局面扩充开局库"""
+        for moves in games:
+            game = Game(self.board_size)
+            for ply, (x, y) in enumerate(moves[:self.max_ply]):
+                player = 1 + ply % 2
+                if player == 2:
+                    self.add_position(game)
+                if not game.make_move(x, y, player):
+                    break
+    
+    def save(self, path):
+        write_book(path, self.board_size, self.max_ply, self.entries)
+
+
+def _read_games(path):
+    with open(path) as f:
+        for line in f:
+            moves = [tuple(int(v) for v in token.split(',')) for token in line.split()]
+            if moves:
+                yield moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成或扩充开局库')
+    parser.add_argument('command', choices=['build', 'extend'])
+    parser.add_argument('games', nargs='?', help='extend 使用的对局文件')
+    parser.add_argument('--size', type=int, default=15)
+    parser.add_argument('--plies', type=int, default=5, help='收录的最大棋子数')
+    parser.add_argument('--width', type=int, default=4, help='build 时黑方每步展开的应对数')
+    parser.add_argument('--time', type=float, default=2.0, help='每个局面的搜索时间(秒)')
+    parser.add_argument('--out', default=DEFAULT_PATH)
+    args = parser.parse_args()
+    
+    builder = BookBuilder(args.size, args.plies, args.time)
+    if os.path.exists(args.out):
+        builder.load(args.out)
+    if args.command == 'build':
+        builder.build(args.width)
+    else:
+        builder.extend(_read_games(args.games))
+    builder.save(args.out)
+    print(f"开局库 {args.out}: {len(builder.entries)} 个局面")
+
+
+if __name__ == '__main__':
+    main()
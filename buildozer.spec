@@ -13,10 +13,11 @@ package.domain = org.gomoku
 source.dir = .
 
 # (list) Source files to include (let empty to include all the files)
-source.include_exts = py,png,jpg,kv,atlas
+source.include_exts = py,png,jpg,kv,atlas,bin
 
 # (list) List of inclusions using pattern matching
-#source.include_patterns = assets/*,images/*.png
+# 开局库和预计算的棋盘表（tables_*.bin 在打包前由 `python tables.py` 生成，不在仓库中）
+source.include_patterns = opening_book.bin,tables_*.bin
 
 # (list) Source files to exclude (let empty to not exclude anything)
 #source.exclude_exts = spec
@@ -1,64 +1,514 @@
 import numpy as np
+import random
+from array import array
+from functools import lru_cache
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+
+from records import (RESULT_BLACK, RESULT_DRAW, RESULT_UNKNOWN, RESULT_WHITE,
+                     RecordReader, RecordWriter)
+from tables import prebuilt
+
+
+def _line_score(player_count, opponent_count):
+    """根据五连窗口内双方的棋子数计算分数（与 Game._evaluate_line 一致）"""
+    empty_count = 5 - player_count - opponent_count
+    
+    # 如果同时有玩家和对手的棋子，这条线不可能形成五连
+    if player_count > 0 and opponent_count > 0:
+        return 0
+    
+    # 根据棋子数量评分
+    if player_count == 5:
+        return 100000  # 五连
+    elif player_count == 4 and empty_count == 1:
+        return 10000   # 活四
+    elif player_count == 3 and empty_count == 2:
+        return 1000    # 活三
+    elif player_count == 2 and empty_count == 3:
+        return 100     # 活二
+    elif player_count == 1 and empty_count == 4:
+        return 10      # 活一
+    
+    # 对手的威胁
+    if opponent_count == 4 and empty_count == 1:
+        return -8000   # 对手活四
+    elif opponent_count == 3 and empty_count == 2:
+        return -800    # 对手活三
+    
+    return 0
+
+
+# 窗口评分表：LINE_SCORES[己方子数][对方子数]
+LINE_SCORES = [[_line_score(p, o) if p + o <= 5 else 0 for o in range(6)]
+               for p in range(6)]
+
+
+# 窗口状态码中每个玩家一颗棋子对应的增量（黑子数 * 6 + 白子数）
+_STATE_STEP = (0, 6, 1)
+
+# 五连窗口按基数3编码（空=0，黑=1，白=2）后的评分表：WINDOW_SCORES[player][code]
+_POWERS3 = 3 ** np.arange(5)
+_CODE_DIGITS = (np.arange(3 ** 5)[:, None] // _POWERS3) % 3
+WINDOW_COUNTS = np.stack([(_CODE_DIGITS == p).sum(axis=1) for p in range(3)])
+WINDOW_SCORES = np.array([
+    np.zeros(3 ** 5, dtype=np.int64),
+    [LINE_SCORES[a][b] for a, b in zip(WINDOW_COUNTS[1], WINDOW_COUNTS[2])],
+    [LINE_SCORES[b][a] for a, b in zip(WINDOW_COUNTS[1], WINDOW_COUNTS[2])],
+], dtype=np.int64)
+
+
+@lru_cache(maxsize=None)
+@prebuilt
+def zobrist_keys(board_size, seed=20240601):
+    """生成固定种子的Zobrist随机数表：keys[player][y * board_size + x]"""
+    rnd = random.Random(seed + board_size)
+    cells = board_size * board_size
+    return (None,
+            tuple(rnd.getrandbits(64) for _ in range(cells)),
+            tuple(rnd.getrandbits(64) for _ in range(cells)))
+
+
+@lru_cache(maxsize=None)
+@prebuilt
+def board_windows(board_size):
+    """预计算棋盘上所有五连窗口，以及经过每个格子的窗口编号
+    
+    返回 (windows, cell_windows)：windows[w] 为窗口 w 的5个格子 (x, y)，
+    cell_windows[y * board_size + x] 为经过该格子的窗口编号（最多20个）。
+    窗口顺序与 window_codes 的输出顺序一致：水平、垂直、对角线、反对角线，
+    每个方向内按起点行优先排列。
+    """
+    n = board_size - 4
+    windows = []
+    # 水平方向
+    windows.extend(tuple((x + i, y) for i in range(5))
+                   for y in range(board_size) for x in range(n))
+    # 垂直方向
+    windows.extend(tuple((x, y + i) for i in range(5))
+                   for y in range(n) for x in range(board_size))
+    # 对角线方向
+    windows.extend(tuple((x + i, y + i) for i in range(5))
+                   for y in range(n) for x in range(n))
+    # 反对角线方向
+    windows.extend(tuple((x + i, y + 4 - i) for i in range(5))
+                   for y in range(n) for x in range(n))
+    
+    cell_windows = [[] for _ in range(board_size * board_size)]
+    for w, cells in enumerate(windows):
+        for cx, cy in cells:
+            cell_windows[cy * board_size + cx].append(w)
+    
+    return tuple(windows), tuple(tuple(ws) for ws in cell_windows)
+
+
+@lru_cache(maxsize=None)
+@prebuilt
+def window_cells(board_size):
+    """board_windows 中每个窗口的5个格子编号 y * board_size + x"""
+    windows, _ = board_windows(board_size)
+    return tuple(tuple(y * board_size + x for x, y in cells) for cells in windows)
+
+
+@lru_cache(maxsize=None)
+@prebuilt
+def direction_rays(board_size):
+    """预计算每个格子在四个方向上向两侧各延伸4格的格子编号
+    
+    rays[y * board_size + x] 是 (水平, 垂直, 对角线, 反对角线) 四项，
+    每项为 (正方向, 反方向) 两个由近到远的格子编号元组，出界处截断。
+    """
+    rays = []
+    for y in range(board_size):
+        for x in range(board_size):
+            cell_rays = []
+            for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                pair = []
+                for sign in (1, -1):
+                    ray = []
+                    for i in range(1, 5):
+                        nx, ny = x + sign * dx * i, y + sign * dy * i
+                        if not (0 <= nx < board_size and 0 <= ny < board_size):
+                            break
+                        ray.append(ny * board_size + nx)
+                    pair.append(tuple(ray))
+                cell_rays.append(tuple(pair))
+            rays.append(tuple(cell_rays))
+    return tuple(rays)
+
+
+@lru_cache(maxsize=None)
+@prebuilt
+def neighbor_cells(board_size, distance=2):
+    """预计算每个格子周围 distance 格范围内（不含自身）的格子编号"""
+    neighbors = []
+    for y in range(board_size):
+        for x in range(board_size):
+            neighbors.append(tuple(
+                ny * board_size + nx
+                for ny in range(max(0, y - distance), min(board_size, y + distance + 1))
+                for nx in range(max(0, x - distance), min(board_size, x + distance + 1))
+                if (nx, ny) != (x, y)))
+    return tuple(neighbors)
+
+
+def window_codes(board):
+    """用跨步视图一次取出全部五连窗口，返回每个窗口的基数3编码
+    
+    顺序与 board_windows 一致。编码只用于查表，窗口内格子的顺序不影响分数。
+    """
+    board = np.ascontiguousarray(board)
+    size = board.shape[0]
+    n = size - 4
+    flat = board.ravel()
+    step = flat.strides[0]
+    
+    horizontal = sliding_window_view(board, 5, axis=1)
+    vertical = sliding_window_view(board, 5, axis=0)
+    diagonal = as_strided(flat, shape=(n, n, 5),
+                          strides=(size * step, step, (size + 1) * step))
+    # 从 (x + 4, y) 开始向左下方取5格，即以 (x, y + 4) 为起点的反对角线窗口
+    anti_diagonal = as_strided(flat[4:], shape=(n, n, 5),
+                               strides=(size * step, step, (size - 1) * step))
+    
+    return np.concatenate([
+        (horizontal @ _POWERS3).ravel(),
+        (vertical @ _POWERS3).ravel(),
+        (diagonal @ _POWERS3).ravel(),
+        (anti_diagonal @ _POWERS3).ravel(),
+    ])
+
+
+def evaluate_board(board, player):
+    """向量化计算整个棋盘对指定玩家的评估分数"""
+    return int(WINDOW_SCORES[player][window_codes(board)].sum())
+
+
+@lru_cache(maxsize=None)
+def cell_coords(board_size):
+    """格子编号到坐标 (x, y) 的对照表"""
+    return tuple((i % board_size, i // board_size) for i in range(board_size * board_size))
+
+
+class MoveHistory:
+    """落子历史，以格子编号保存在 Game.moves（array('H')）中
+    
+    按下标读取和迭代时得到 (x, y)，元组取自预先生成的坐标表，不分配新对象；
+    切片返回 (x, y) 的列表。
+    """
+    __slots__ = ('moves', '_coords', '_board_size')
+    
+    def __init__(self, moves, board_size, coords=None):
+        self.moves = moves
+        # coords 为格子编号到 (x, y) 的对照表，默认使用 cell_coords(board_size)
+        self._coords = cell_coords(board_size) if coords is None else coords
+        self._board_size = board_size
+    
+    def __len__(self):
+        return len(self.moves)
+    
+    def __getitem__(self, i):
+        try:
+            return self._coords[self.moves[i]]
+        except TypeError:
+            return [self._coords[m] for m in self.moves[i]]
+    
+    def __iter__(self):
+        return map(self._coords.__getitem__, self.moves)
+    
+    def __eq__(self, other):
+        return list(self) == list(other)
+    
+    def __repr__(self):
+        return repr(list(self))
+    
+    def append(self, move):
+        x, y = move
+        self.moves.append(y * self._board_size + x)
+    
+    def pop(self):
+        return self._coords[self.moves.pop()]
+
 
 class Game:
+    # 每个局面只保存紧凑的状态，方便大量创建副本（多进程、开局库、自对弈）
+    __slots__ = ('board_size', 'cells', 'board', 'moves', 'history', 'hash', 'candidates',
+                 '_windows', '_cell_windows', '_window_cells', '_zobrist', '_neighbors',
+                 '_cell_coords', '_rays', '_window_counts', '_scores', '_window_states',
+                 '_neighbor_counts')
+    
     def __init__(self, board_size=15):
         self.board_size = board_size
+        self._windows, self._cell_windows = board_windows(board_size)
+        self._window_cells = window_cells(board_size)
+        self._zobrist = zobrist_keys(board_size)
+        self._neighbors = neighbor_cells(board_size)
+        self._cell_coords = cell_coords(board_size)
+        self._rays = direction_rays(board_size)
+        # 棋盘按格子编号 y * board_size + x 保存在 bytearray 中（0=空，1=黑，2=白），
+        # board 是同一块内存上的 int8 二维视图，board[y][x] 的写法仍然可用
+        self.cells = bytearray(board_size * board_size)
+        self.board = np.frombuffer(self.cells, dtype=np.int8).reshape(board_size, board_size)
         self.reset()
     
     def reset(self):
         """重置游戏状态"""
-        self.board = np.zeros((self.board_size, self.board_size), dtype=int)
-        self.history = []  # 存储移动历史 [(x, y), ...]
+        self.board.fill(0)
+        # 落子历史：moves 按顺序保存格子编号，history 以 (x, y) 的形式读取同一份数据
+        self.moves = array('H')
+        self.history = MoveHistory(self.moves, self.board_size)
+        # 增量评估状态：每个窗口内双方的棋子数，以及双方的当前总分
+        self._window_counts = [None, [0] * len(self._windows), [0] * len(self._windows)]
+        self._scores = [0, 0, 0]
+        # 每个窗口的状态码 黑子数 * 6 + 白子数，便于用 bytearray.find 快速查找威胁窗口
+        self._window_states = bytearray(len(self._windows))
+        self.hash = 0  # 当前局面的Zobrist哈希，随落子和悔棋增量更新
+        # 候选点：周围2格内有棋子的空位，按格子编号保存；计数为每格周围的棋子数
+        self._neighbor_counts = [0] * (self.board_size * self.board_size)
+        self.candidates = set()
+    
+    def copy(self):
+        """复制当前局面（包括落子顺序），副本与原对象互不影响"""
+        game = type(self)(self.board_size)
+        game.restore(self.snapshot())
+        return game
+    
+    def snapshot(self):
+        """返回局面的紧凑快照 (board_size, 棋盘字节, 落子顺序字节)
+        
+        快照只由 int 和 bytes 组成，可以直接 pickle 传给其他进程，用 restore()
+        或 Game.from_snapshot() 还原（增量评估状态由重放落子重建）。
+        """
+        return (self.board_size, bytes(self.cells), self.moves.tobytes())
+    
+    def restore(self, snapshot):
+        """还原 snapshot() 保存的局面"""
+        board_size, cells, moves = snapshot
+        if board_size != self.board_size:
+            raise ValueError(f"快照的棋盘大小 {board_size} 与当前棋盘 {self.board_size} 不同")
+        self.reset()
+        coords = self._cell_coords
+        for index in array('H', moves):
+            x, y = coords[index]
+            self.make_move(x, y, cells[index])
+    
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """由 snapshot() 保存的快照创建新局面"""
+        game = cls(snapshot[0])
+        game.restore(snapshot)
+        return game
+    
+    def save(self, path, result=None, metadata=None):
+        """把本局追加到对局记录文件（格式见 records.py）
+        
+        result 为 None 时由局面推断：最后一步成五为该方胜，满盘为和棋，否则为未下完。
+        metadata 为可 JSON 序列化的字典，例如对局双方和日期。
+        """
+        cells = self.cells
+        for ply, index in enumerate(self.moves):
+            if cells[index] != 1 + ply % 2:
+                raise ValueError("只能保存黑先、双方交替落子的对局")
+        if result is None:
+            result = RESULT_UNKNOWN
+            last = self.last_move()
+            if last is not None:
+                player = cells[last[1] * self.board_size + last[0]]
+                if self.check_win(last[0], last[1], player):
+                    result = RESULT_BLACK if player == 1 else RESULT_WHITE
+                elif self.is_board_full():
+                    result = RESULT_DRAW
+        with RecordWriter(path) as writer:
+            writer.write(self.board_size, self.moves, result, metadata)
+    
+    @classmethod
+    def load(cls, path, index=0):
+        """读取对局记录文件中的第 index 局，返回重放好的局面"""
+        with RecordReader(path) as reader:
+            for i, record in enumerate(reader):
+                if i == index:
+                    game = record.replay(cls(record.board_size))
+                    record.release()
+                    return game
+        raise IndexError(f"{path} 中没有第 {index} 局")
+    
+    def __reduce__(self):
+        # board 是 cells 上的视图，直接 pickle 会得到两份互不相关的数据，改为传递快照
+        return (type(self).from_snapshot, (self.snapshot(),))
+    
+    def load_board(self, board):
+        """载入一个棋盘局面并重建增量评估状态
+        
+        局面不含落子顺序，历史按行优先顺序记录棋盘上的棋子。
+        """
+        self.reset()
+        self.board[:, :] = board
+        cells = self.cells
+        self.moves.extend(i for i, piece in enumerate(cells) if piece)
+        self._rebuild_windows()
+        for index in self.moves:
+            self.hash ^= self._zobrist[cells[index]][index]
+            for n in self._neighbors[index]:
+                self._neighbor_counts[n] += 1
+        self.candidates = {i for i, count in enumerate(self._neighbor_counts)
+                           if count and cells[i] == 0}
+    
+    def _rebuild_windows(self):
+        """由当前棋盘一次性重建所有窗口计数和双方总分"""
+        codes = window_codes(self.board)
+        self._window_counts = [None, WINDOW_COUNTS[1][codes].tolist(),
+                               WINDOW_COUNTS[2][codes].tolist()]
+        self._scores = [0, int(WINDOW_SCORES[1][codes].sum()),
+                        int(WINDOW_SCORES[2][codes].sum())]
+        self._window_states = bytearray(
+            (WINDOW_COUNTS[1][codes] * 6 + WINDOW_COUNTS[2][codes]).astype(np.uint8).tobytes())
     
     def is_valid_move(self, x, y):
         """检查移动是否有效"""
         if x < 0 or x >= self.board_size or y < 0 or y >= self.board_size:
             return False
-        return self.board[y][x] == 0
+        return self.cells[y * self.board_size + x] == 0
+    
+    def piece_at(self, x, y):
+        """(x, y) 上的棋子：0=空，1=黑，2=白"""
+        return self.cells[y * self.board_size + x]
     
     def make_move(self, x, y, player):
         """在指定位置落子"""
         if self.is_valid_move(x, y):
-            self.board[y][x] = player
-            self.history.append((x, y))
+            index = y * self.board_size + x
+            self.cells[index] = player
+            self.moves.append(index)
+            self._update_windows(index, player, 1)
+            self.hash ^= self._zobrist[player][index]
+            self._add_neighbors(index)
             return True
         return False
     
     def undo_move(self):
         """撤销最后一步移动"""
-        if self.history:
-            x, y = self.history.pop()
-            self.board[y][x] = 0
+        if self.moves:
+            index = self.moves.pop()
+            player = self.cells[index]
+            self.cells[index] = 0
+            self._update_windows(index, player, -1)
+            self.hash ^= self._zobrist[player][index]
+            self._remove_neighbors(index)
             return True
         return False
     
+    def last_move(self):
+        """最后一步的坐标 (x, y)，还没有落子时返回 None"""
+        moves = self.moves
+        return self._cell_coords[moves[-1]] if moves else None
+    
+    def _update_windows(self, index, player, delta):
+        """增量更新经过格子 index 的窗口计数和双方总分"""
+        counts = self._window_counts[player]
+        opponent_counts = self._window_counts[3 - player]
+        states = self._window_states
+        state_delta = delta * _STATE_STEP[player]
+        player_change = 0
+        opponent_change = 0
+        
+        for w in self._cell_windows[index]:
+            old = counts[w]
+            new = old + delta
+            other = opponent_counts[w]
+            player_change += LINE_SCORES[new][other] - LINE_SCORES[old][other]
+            opponent_change += LINE_SCORES[other][new] - LINE_SCORES[other][old]
+            counts[w] = new
+            states[w] += state_delta
+        
+        self._scores[player] += player_change
+        self._scores[3 - player] += opponent_change
+    
+    def _add_neighbors(self, index):
+        """落子后更新候选点：该格不再是候选点，周围空位的计数加一"""
+        self.candidates.discard(index)
+        counts = self._neighbor_counts
+        cells = self.cells
+        for n in self._neighbors[index]:
+            counts[n] += 1
+            if counts[n] == 1 and cells[n] == 0:
+                self.candidates.add(n)
+    
+    def _remove_neighbors(self, index):
+        """悔棋后更新候选点：周围计数减一，清空的格子重新成为候选点"""
+        counts = self._neighbor_counts
+        for n in self._neighbors[index]:
+            counts[n] -= 1
+            if counts[n] == 0:
+                self.candidates.discard(n)
+        if counts[index]:
+            self.candidates.add(index)
+    
+    def get_candidate_moves(self):
+        """获取周围2格内有棋子的所有空位"""
+        coords = self._cell_coords
+        return [coords[i] for i in self.candidates]
+    
+    def score_move_delta(self, x, y, player):
+        """不改动棋盘，计算在空位 (x, y) 落子带来的评估分数变化
+        
+        返回 (attack, defence)：attack 为 player 在此落子后 evaluate_position(player)
+        的增量，defence 为对手在此落子后 evaluate_position(对手) 的增量。
+        只查看经过 (x, y) 的窗口。
+        """
+        counts = self._window_counts[player]
+        opponent_counts = self._window_counts[3 - player]
+        attack = 0
+        defence = 0
+        
+        for w in self._cell_windows[y * self.board_size + x]:
+            own = counts[w]
+            other = opponent_counts[w]
+            attack += LINE_SCORES[own + 1][other] - LINE_SCORES[own][other]
+            defence += LINE_SCORES[other + 1][own] - LINE_SCORES[other][own]
+        
+        return attack, defence
+    
+    def get_threat_moves(self, player, stones):
+        """获取位于“player 有 stones 子且无对手棋子”的窗口中的所有空位
+        
+        stones=4 时即为成五点，stones=3 时为冲四点，stones=2 时为成三点。
+        """
+        states = self._window_states
+        windows = self._window_cells
+        cells = self.cells
+        coords = self._cell_coords
+        target = stones * _STATE_STEP[player]
+        moves = set()
+        
+        w = states.find(target)
+        while w >= 0:
+            for i in windows[w]:
+                if cells[i] == 0:
+                    moves.add(coords[i])
+            w = states.find(target, w + 1)
+        
+        return moves
+    
+    def count_threat_windows(self, x, y, player, stones):
+        """统计经过 (x, y) 且 player 恰有 stones 子、没有对手棋子的窗口数"""
+        counts = self._window_counts[player]
+        opponent_counts = self._window_counts[3 - player]
+        return sum(1 for w in self._cell_windows[y * self.board_size + x]
+                   if counts[w] == stones and opponent_counts[w] == 0)
+    
     def check_win(self, x, y, player):
         """检查指定玩家是否在指定位置获胜"""
-        directions = [
-            [(1, 0), (-1, 0)],  # 水平
-            [(0, 1), (0, -1)],  # 垂直
-            [(1, 1), (-1, -1)],  # 对角线
-            [(1, -1), (-1, 1)]   # 反对角线
-        ]
-        
-        for dir_pair in directions:
+        cells = self.cells
+        # 水平、垂直、对角线、反对角线，每个方向沿预先算好的两条射线计数
+        for forward, backward in self._rays[y * self.board_size + x]:
             count = 1  # 当前位置已经有一个棋子
-            
-            # 检查两个相反的方向
-            for dx, dy in dir_pair:
-                temp_x, temp_y = x, y
-                
-                # 沿着当前方向计数连续的棋子
-                for _ in range(4):  # 最多需要检查4步
-                    temp_x += dx
-                    temp_y += dy
-                    
-                    if (0 <= temp_x < self.board_size and 
-                        0 <= temp_y < self.board_size and 
-                        self.board[temp_y][temp_x] == player):
-                        count += 1
-                    else:
-                        break
+            for i in forward:
+                if cells[i] != player:
+                    break
+                count += 1
+            for i in backward:
+                if cells[i] != player:
+                    break
+                count += 1
             
             # 如果找到5个连续的棋子，玩家获胜
             if count >= 5:
@@ -67,24 +517,31 @@ class Game:
         return False
     
     def is_board_full(self):
-        """检查棋盘是否已满"""
-        return np.all(self.board != 0)
+        """检查棋盘是否已满（每个棋子都记录在历史中）"""
+        return len(self.moves) == len(self.cells)
     
     def get_valid_moves(self):
         """获取所有有效的移动"""
-        valid_moves = []
-        for y in range(self.board_size):
-            for x in range(self.board_size):
-                if self.is_valid_move(x, y):
-                    valid_moves.append((x, y))
-        return valid_moves
+        coords = self._cell_coords
+        return [coords[i] for i, piece in enumerate(self.cells) if piece == 0]
     
     def get_board_state(self):
         """获取当前棋盘状态的副本"""
         return self.board.copy()
     
     def evaluate_position(self, player):
-        """评估当前棋盘对指定玩家的有利程度"""
+        """评估当前棋盘对指定玩家的有利程度
+        
+        分数由 make_move/undo_move 增量维护，这里直接返回，复杂度 O(1)。
+        """
+        return self._scores[player]
+    
+    def evaluate_position_full(self, player):
+        """对整个棋盘做一次完整评估（向量化，用于重建、校验和分析）"""
+        return evaluate_board(self.board, player)
+    
+    def _evaluate_position_scan(self, player):
+        """逐个窗口循环扫描的完整评估（原始实现，用于对照和基准测试）"""
         opponent = 3 - player  # 1->2, 2->1
         
         # 初始化分数
@@ -105,12 +562,12 @@ class Game:
                 
                 # 对角线方向
                 if x <= self.board_size - 5 and y <= self.board_size - 5:
-                    line = [self.board[y+i, x+i] for i in range(5)]
+                    line = np.array([self.board[y+i, x+i] for i in range(5)])
                     score += self._evaluate_line(line, player, opponent)
                 
                 # 反对角线方向
                 if x <= self.board_size - 5 and y >= 4:
-                    line = [self.board[y-i, x+i] for i in range(5)]
+                    line = np.array([self.board[y-i, x+i] for i in range(5)])
                     score += self._evaluate_line(line, player, opponent)
         
         return score
@@ -118,30 +575,7 @@ class Game:
     def _evaluate_line(self, line, player, opponent):
         """评估一条线的分数"""
         # 计算玩家和对手的棋子数
-        player_count = np.sum(line == player)
-        opponent_count = np.sum(line == opponent)
-        empty_count = np.sum(line == 0)
-        
-        # 如果同时有玩家和对手的棋子，这条线不可能形成五连
-        if player_count > 0 and opponent_count > 0:
-            return 0
-        
-        # 根据棋子数量评分
-        if player_count == 5:
-            return 100000  # 五连
-        elif player_count == 4 and empty_count == 1:
-            return 10000   # 活四
-        elif player_count == 3 and empty_count == 2:
-            return 1000    # 活三
-        elif player_count == 2 and empty_count == 3:
-            return 100     # 活二
-        elif player_count == 1 and empty_count == 4:
-            return 10      # 活一
-        
-        # 对手的威胁
-        if opponent_count == 4 and empty_count == 1:
-            return -8000   # 对手活四
-        elif opponent_count == 3 and empty_count == 2:
-            return -800    # 对手活三
-        
-        return 0
\ No newline at end of file
+        player_count = int(np.sum(line == player))
+        opponent_count = int(np.sum(line == opponent))
+        
+        return _line_score(player_count, opponent_count)
@@ -1,110 +1,388 @@
 from kivy.app import App
-from kivy.uix.widget import Widget
+from kivy.uix.stencilview import StencilView
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
-from kivy.graphics import Color, Ellipse, Line, Rectangle
+from kivy.graphics import (Color, Ellipse, InstructionGroup, Line, PopMatrix, PushMatrix,
+                           Rectangle, Scale, Translate)
 from kivy.core.window import Window
 from kivy.clock import Clock
-from kivy.metrics import dp
-import numpy as np
+from kivy.logger import Logger
+from kivy.metrics import Metrics, dp
+import math
+import os
+import threading
 import time
 
-from game import Game
-from ai import AI
+# 引擎模块（game、ai 等，连带 NumPy）在第一帧画出之后才在后台线程中导入，
+# 见 GomokuBoard.load_engine；这里只导入界面需要的模块
 
 # 设置窗口大小
 Window.size = (800, 600)
 
-class GomokuBoard(Widget):
-    def __init__(self, **kwargs):
+# 设置此环境变量时打印启动各阶段的时间，引擎载入后退出，供 startup.py 测量冷启动
+STARTUP_TRACE = bool(os.environ.get('WUZIQI_STARTUP_TRACE'))
+
+
+def trace_startup(phase):
+    if STARTUP_TRACE:
+        print(f'STARTUP {phase} {time.time():.6f}', flush=True)
+
+trace_startup('imports')
+
+# 可以切换的棋盘：15路、19路和无限棋盘（None，用稀疏棋盘表示）
+BOARD_MODES = (15, 19, None)
+# 格子大小(dp)的缩放范围，以及整个棋盘放不下时的默认大小
+MIN_GRID_DP = 8
+MAX_GRID_DP = 80
+DEFAULT_GRID_DP = 30
+# 触点移动超过这个距离(dp)就算拖动棋盘，不再落子
+TAP_SLOP_DP = 10
+# 滚轮每格的缩放倍数
+WHEEL_ZOOM = 1.15
+# 棋子和最后一步标记的半径（以格子为单位）
+STONE_RADIUS = 13 / 30
+MARKER_RADIUS = 0.1
+
+
+def create_engine(board_size, book):
+    """为 board_size 路棋盘（None 为无限棋盘）创建棋局、AI 和后台搜索，返回 (game, ai, worker)"""
+    from ai import AI
+    from game import Game
+    from sparse import SparseGame
+    from worker import SearchWorker
+    # 有限棋盘用稠密的 Game；无限棋盘用稀疏棋盘，开销只与棋子数有关
+    game = Game(board_size) if board_size else SparseGame()
+    ai = AI(game, difficulty=3, book=book)  # 难度级别3（最高）
+    # AI在后台线程中搜索局面副本，避免界面卡顿
+    return game, ai, SearchWorker(ai)
+
+class GomokuBoard(StencilView):
+    def __init__(self, board_size=15, **kwargs):
         super(GomokuBoard, self).__init__(**kwargs)
-        self.board_size = 15
-        self.grid_size = dp(30)
-        self.board_margin = dp(50)
-        self.game = Game(self.board_size)
-        self.ai = AI(self.game, difficulty=3)  # 难度级别3（最高）
+        self.board_size = board_size
+        self.line_count = board_size  # 每边的线数，无限棋盘为稀疏棋盘的虚拟边长
+        # 引擎在 load_engine 中载入，之前棋盘只显示不能落子
+        self.book = None
+        self.game = None
+        self.ai = None
+        self.ai_worker = None
+        self.failed_load = None  # 上次载入失败时的 (board_size, callback)，重新开始时重试
+        self.thinking_event = None  # “AI思考中...”动画的定时器
+        self.thinking_dots = 0
+        self.pondering = True  # 玩家思考时，AI按预测的玩家应对提前搜索
+        self.debug_label = None  # 显示搜索统计的调试信息，关闭时为 None
         self.player_turn = True  # True表示玩家回合，False表示AI回合
         self.game_over = False
         self.winner = None
         self.last_move = None
         
-        # 绘制棋盘
-        self.draw_board()
+        # 视图：控件中心显示的棋盘坐标（平移）和相邻交叉点的距离（缩放）。
+        # 没有手动平移缩放时 fit_view 为 True，布局变化后自动把整个棋盘放进控件
+        self.view_center = (0.0, 0.0)
+        self.grid_size = dp(DEFAULT_GRID_DP)
+        self.fit_view = True
+        self.touches = []  # 按在棋盘上的触点，两个触点时双指缩放
+        
+        # 画布分层：棋盘背景和网格按窗口坐标只画可见的部分；棋子以格子为单位画在
+        # 一个变换下，每个棋子一个指令组，落子和悔棋时只增删对应的指令组，平移缩放
+        # 只改变换，与棋子数无关；最后一步的标记是一个移动的圆点
+        self.board_group = InstructionGroup()
+        self.stones_group = InstructionGroup()
+        self.stones = []  # 已画出的棋子 [(x, y, 指令组), ...]，顺序与 history 一致
+        self.marker_color = Color(0, 0, 0, 0)
+        self.marker = Ellipse(pos=(0, 0), size=(0, 0))
+        # 棋盘坐标 -> 窗口坐标：先移到视图中心，再缩放，再移到控件中心
+        self.view_translate = Translate()
+        self.view_scale = Scale()
+        self.view_offset = Translate()
+        self.canvas.add(self.board_group)
+        self.canvas.add(PushMatrix())
+        self.canvas.add(self.view_translate)
+        self.canvas.add(self.view_scale)
+        self.canvas.add(self.view_offset)
+        self.canvas.add(self.stones_group)
+        self.canvas.add(self.marker_color)
+        self.canvas.add(self.marker)
+        self.canvas.add(PopMatrix())
         
-        # 设置定时器检查AI回合
-        Clock.schedule_interval(self.check_ai_turn, 0.1)
+        # 窗口大小或屏幕密度变化时只重新计算视图，棋子不用重画；
+        # 同一帧内的多次变化合并为一次布局
+        self.layout_trigger = Clock.create_trigger(self.update_layout)
+        self.bind(pos=self.layout_trigger, size=self.layout_trigger)
+        Metrics.bind(density=self.layout_trigger, dpi=self.layout_trigger)
+    
+    def load_engine(self, board_size, callback):
+        """在后台线程导入引擎模块、打开开局库并创建 board_size 路棋盘的 AI，完成后在界面线程中调用 callback()
+        
+        开局库打不开时不用开局库；引擎创建失败时在状态栏提示，点“重新开始”重试。
+        """
+        self.failed_load = None
+        self.update_status('载入中...')
+        
+        def run():
+            book = self.book
+            if book is None:
+                try:
+                    from book import OpeningBook
+                    book = OpeningBook.open_default()
+                except Exception:
+                    Logger.exception('Gomoku: 开局库打开失败，不使用开局库')
+            try:
+                engine = create_engine(board_size, book)
+            except Exception:
+                Logger.exception('Gomoku: 引擎载入失败')
+                Clock.schedule_once(lambda dt: self.engine_failed(board_size, callback))
+                return
+            Clock.schedule_once(lambda dt: self.engine_ready(board_size, book, engine, callback))
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def engine_ready(self, board_size, book, engine, callback):
+        self.book = book
+        self.set_engine(board_size, engine)
+        callback()
+    
+    def engine_failed(self, board_size, callback):
+        self.failed_load = (board_size, callback)
+        self.update_status('载入失败\n点“重新开始”重试')
+    
+    def set_engine(self, board_size, engine):
+        self.board_size = board_size
+        self.game, self.ai, self.ai_worker = engine
+        self.line_count = self.game.board_size
+    
+    def set_board_size(self, board_size, callback=None):
+        """换成另一种棋盘并重新开始
+        
+        新棋盘的引擎在后台载入（无限棋盘第一次使用时要导入稀疏棋盘），
+        期间旧棋盘的棋子已清除、不能落子，载入后调用 callback()。
+        """
+        if self.game is None:
+            return  # 引擎还在载入
+        self.stop_thinking()
+        debug = self.debug_label is not None
+        self.set_debug(False)
+        self.game = self.ai = self.ai_worker = None
+        self.stones_group.clear()
+        self.stones = []
+        self.last_move = None
+        self.update_marker()
+        
+        def ready():
+            self.set_debug(debug)
+            self.reset_game()
+            if callback is not None:
+                callback()
+        
+        self.load_engine(board_size, ready)
+    
+    def update_layout(self, *args):
+        """控件大小变化：自动适配时重新放下整个棋盘，否则保持视图中心和缩放"""
+        if self.fit_view:
+            self.fit_board()
+        self.update_view()
+        self.update_debug_layout()
+    
+    def fit_board(self):
+        """棋盘居中并尽量放满控件；无限棋盘按默认格子大小显示棋子所在的区域"""
+        if self.board_size is None:
+            self.grid_size = dp(DEFAULT_GRID_DP)
+            box = self.game.bounding_box()
+            if box is None:
+                center = self.line_count // 2
+                self.view_center = (center, center)
+            else:
+                self.view_center = ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+            return
+        margin = dp(50)
+        last = self.line_count - 1
+        span = min(self.width, self.height) - 2 * margin
+        self.grid_size = min(dp(MAX_GRID_DP), max(dp(MIN_GRID_DP), span / last))
+        self.view_center = (last / 2, last / 2)
+    
+    def update_view(self):
+        """按 view_center 和 grid_size 更新棋子的变换，并重画可见的网格"""
+        grid = self.grid_size
+        self.view_translate.xy = self.center
+        self.view_scale.xyz = (grid, grid, 1)
+        self.view_offset.xy = (-self.view_center[0], -self.view_center[1])
+        self.draw_board()
+    
+    def set_view(self, grid_size, board_point, window_point):
+        """把格子大小设为 grid_size，并让棋盘坐标 board_point 显示在窗口坐标 window_point 上"""
+        self.fit_view = False
+        self.grid_size = grid_size = min(dp(MAX_GRID_DP), max(dp(MIN_GRID_DP), grid_size))
+        # 视图中心不离开棋盘，避免把棋盘拖出视野
+        last = self.line_count - 1
+        cx = board_point[0] - (window_point[0] - self.center_x) / grid_size
+        cy = board_point[1] - (window_point[1] - self.center_y) / grid_size
+        self.view_center = (min(last, max(0, cx)), min(last, max(0, cy)))
+        self.update_view()
+    
+    def to_window(self, x, y):
+        """棋盘坐标（可以是小数）对应的窗口坐标"""
+        return (self.center_x + (x - self.view_center[0]) * self.grid_size,
+                self.center_y + (y - self.view_center[1]) * self.grid_size)
+    
+    def to_board(self, px, py):
+        """窗口坐标对应的棋盘坐标（小数）"""
+        return (self.view_center[0] + (px - self.center_x) / self.grid_size,
+                self.view_center[1] + (py - self.center_y) / self.grid_size)
     
     def draw_board(self):
-        self.canvas.clear()
-        with self.canvas:
-            # 绘制棋盘背景
-            Color(0.86, 0.71, 0.27)  # 棋盘颜色
-            Rectangle(pos=(self.board_margin, self.board_margin), 
-                     size=(self.grid_size * (self.board_size - 1), 
-                           self.grid_size * (self.board_size - 1)))
-            
-            # 绘制网格线
-            Color(0, 0, 0)  # 黑色线
-            for i in range(self.board_size):
-                # 横线
-                Line(points=[self.board_margin, self.board_margin + i * self.grid_size, 
-                            self.board_margin + (self.board_size - 1) * self.grid_size, 
-                            self.board_margin + i * self.grid_size],
-                    width=1.5 if i == 0 or i == self.board_size - 1 else 1)
-                # 竖线
-                Line(points=[self.board_margin + i * self.grid_size, self.board_margin,
-                            self.board_margin + i * self.grid_size, 
-                            self.board_margin + (self.board_size - 1) * self.grid_size],
-                    width=1.5 if i == 0 or i == self.board_size - 1 else 1)
-            
-            # 绘制天元和星位
-            star_points = [3, 7, 11] if self.board_size == 15 else [3, 5, 7]
-            for x in star_points:
-                for y in star_points:
-                    Color(0, 0, 0)  # 黑色
-                    Ellipse(pos=(self.board_margin + x * self.grid_size - dp(3),
-                                self.board_margin + y * self.grid_size - dp(3)),
-                            size=(dp(6), dp(6)))
-            
-            # 绘制棋子
-            for y in range(self.board_size):
-                for x in range(self.board_size):
-                    piece = self.game.board[y][x]
-                    if piece != 0:
-                        if piece == 1:  # 黑棋
-                            Color(0, 0, 0)
-                        else:  # 白棋
-                            Color(1, 1, 1)
-                        
-                        pos_x = self.board_margin + x * self.grid_size
-                        pos_y = self.board_margin + y * self.grid_size
-                        
-                        # 绘制棋子
-                        Ellipse(pos=(pos_x - dp(13), pos_y - dp(13)),
-                                size=(dp(26), dp(26)))
-                        
-                        # 如果是白棋，添加黑色边框
-                        if piece == 2:
-                            Color(0, 0, 0)
-                            Line(circle=(pos_x, pos_y, dp(13)), width=1)
-                        
-                        # 标记最后一步
-                        if self.last_move and self.last_move[0] == x and self.last_move[1] == y:
-                            if piece == 1:  # 黑棋上标白点
-                                Color(1, 1, 1)
-                            else:  # 白棋上标黑点
-                                Color(0, 0, 0)
-                            Ellipse(pos=(pos_x - dp(3), pos_y - dp(3)),
-                                    size=(dp(6), dp(6)))
+        """重画棋盘背景、网格线和星位（只在视图变化时调用，只画控件内可见的部分）"""
+        group = self.board_group
+        group.clear()
+        last = self.line_count - 1
+        left, bottom = self.to_board(self.x, self.y)
+        right, top = self.to_board(self.right, self.top)
+        
+        # 绘制棋盘背景
+        group.add(Color(0.86, 0.71, 0.27))  # 棋盘颜色
+        if self.board_size is None:
+            group.add(Rectangle(pos=self.pos, size=self.size))
+        else:
+            ox, oy = self.to_window(0, 0)
+            span = self.grid_size * last
+            group.add(Rectangle(pos=(ox, oy), size=(span, span)))
+        
+        # 绘制网格线：只画可见的线，每条线也只画到控件边缘
+        group.add(Color(0, 0, 0))  # 黑色线
+        x0, x1 = max(0, left), min(last, right)
+        y0, y1 = max(0, bottom), min(last, top)
+        if x0 > x1 or y0 > y1:
+            return
+        px0, py0 = self.to_window(x0, y0)
+        px1, py1 = self.to_window(x1, y1)
+        for i in range(math.ceil(y0), math.floor(y1) + 1):
+            width = 1.5 if i == 0 or i == last else 1
+            py = self.to_window(0, i)[1]
+            # 横线
+            group.add(Line(points=[px0, py, px1, py], width=width))
+        for i in range(math.ceil(x0), math.floor(x1) + 1):
+            width = 1.5 if i == 0 or i == last else 1
+            px = self.to_window(i, 0)[0]
+            # 竖线
+            group.add(Line(points=[px, py0, px, py1], width=width))
+        
+        # 绘制天元和星位（无限棋盘没有星位）
+        if self.board_size is None:
+            return
+        if self.board_size == 15:
+            star_points = [3, 7, 11]
+        elif self.board_size == 19:
+            star_points = [3, 9, 15]
+        else:
+            star_points = [3, 5, 7]
+        radius = self.grid_size * 0.1
+        for x in star_points:
+            for y in star_points:
+                px, py = self.to_window(x, y)
+                group.add(Ellipse(pos=(px - radius, py - radius), size=(2 * radius, 2 * radius)))
+    
+    def update_stones(self):
+        """让画出的棋子与棋局一致：只撤掉被悔掉的棋子、补上新下的棋子"""
+        history = self.game.history
+        stones = self.stones
+        while stones and (len(stones) > len(history) or
+                          stones[-1][:2] != tuple(history[len(stones) - 1])):
+            self.stones_group.remove(stones.pop()[2])
+        for x, y in history[len(stones):]:
+            piece = self.game.piece_at(x, y)
+            group = InstructionGroup()
+            if piece == 1:  # 黑棋
+                group.add(Color(0, 0, 0))
+            else:  # 白棋
+                group.add(Color(1, 1, 1))
+            # 以格子为单位画在视图变换下，平移缩放时不用改动
+            group.add(Ellipse(pos=(x - STONE_RADIUS, y - STONE_RADIUS),
+                              size=(2 * STONE_RADIUS, 2 * STONE_RADIUS)))
+            if piece == 2:
+                # 白棋添加黑色边框（宽度为1的线不随缩放变粗）
+                group.add(Color(0, 0, 0))
+                group.add(Line(circle=(x, y, STONE_RADIUS), width=1))
+            self.stones_group.add(group)
+            stones.append((x, y, group))
+        self.update_marker()
+    
+    def update_marker(self):
+        """把最后一步的标记移到 last_move 上"""
+        if self.last_move is None:
+            self.marker_color.rgba = (0, 0, 0, 0)
+            return
+        x, y = self.last_move
+        if self.game.piece_at(x, y) == 1:  # 黑棋上标白点
+            self.marker_color.rgba = (1, 1, 1, 1)
+        else:  # 白棋上标黑点
+            self.marker_color.rgba = (0, 0, 0, 1)
+        self.marker.pos = (x - MARKER_RADIUS, y - MARKER_RADIUS)
+        self.marker.size = (2 * MARKER_RADIUS, 2 * MARKER_RADIUS)
     
     def on_touch_down(self, touch):
-        if self.game_over or not self.player_turn:
+        if not self.collide_point(*touch.pos):
+            return False
+        if touch.is_mouse_scrolling:
+            # 滚轮缩放，鼠标下的位置保持不动
+            if touch.button == 'scrolldown':
+                factor = WHEEL_ZOOM
+            elif touch.button == 'scrollup':
+                factor = 1 / WHEEL_ZOOM
+            else:
+                return True
+            self.set_view(self.grid_size * factor, self.to_board(*touch.pos), touch.pos)
+            return True
+        
+        # 松开时没有移动过的单个触点才算落子，拖动平移，两个触点缩放
+        touch.grab(self)
+        self.touches.append(touch)
+        touch.ud['board_tap'] = len(self.touches) == 1
+        if len(self.touches) > 1:
+            for other in self.touches:
+                other.ud['board_tap'] = False
+        return True
+    
+    def on_touch_move(self, touch):
+        if touch.grab_current is not self:
+            return False
+        if len(self.touches) == 1:
+            if touch.ud['board_tap']:
+                if math.dist(touch.pos, touch.opos) < dp(TAP_SLOP_DP):
+                    return True
+                # 开始拖动，从按下的位置算起
+                touch.ud['board_tap'] = False
+                previous = touch.opos
+            else:
+                previous = touch.ppos
+            self.set_view(self.grid_size, self.to_board(*previous), touch.pos)
+        elif len(self.touches) == 2:
+            # 双指缩放：两指中点下的棋盘位置跟着中点移动，格子大小按两指距离缩放
+            other = self.touches[0] if self.touches[1] is touch else self.touches[1]
+            old_distance = math.dist(touch.ppos, other.pos)
+            if old_distance > 0:
+                old_mid = ((touch.px + other.x) / 2, (touch.py + other.y) / 2)
+                new_mid = ((touch.x + other.x) / 2, (touch.y + other.y) / 2)
+                factor = math.dist(touch.pos, other.pos) / old_distance
+                self.set_view(self.grid_size * factor, self.to_board(*old_mid), new_mid)
+        return True
+    
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return False
+        touch.ungrab(self)
+        self.touches.remove(touch)
+        if touch.ud['board_tap']:
+            self.play_at(touch.pos)
+        return True
+    
+    def play_at(self, pos):
+        """玩家点击了窗口坐标 pos"""
+        if self.game is None or self.game_over or not self.player_turn:
             return
         
         # 计算点击的棋盘坐标
-        board_pos = self.get_board_position(touch.pos)
+        board_pos = self.get_board_position(pos)
         if board_pos and self.game.is_valid_move(board_pos[0], board_pos[1]):
             # 玩家落子
             self.game.make_move(board_pos[0], board_pos[1], 1)  # 玩家使用黑子(1)
@@ -112,80 +390,207 @@ class GomokuBoard(Widget):
             
             # 检查游戏是否结束
             if self.game.check_win(board_pos[0], board_pos[1], 1):
+                self.stop_thinking()
                 self.game_over = True
+                self.save_record()
                 self.winner = 1
-                self.parent.update_status("你赢了！")
+                self.update_status("你赢了！")
             elif self.game.is_board_full():
+                self.stop_thinking()
                 self.game_over = True
+                self.save_record()
                 self.winner = 0  # 平局
-                self.parent.update_status("平局！")
+                self.update_status("平局！")
             else:
                 self.player_turn = False
-                self.parent.update_status("AI思考中...")
+                if self.ai_worker.ponder_move == board_pos:
+                    # 猜中了玩家的走法，后台思考的搜索继续进行
+                    self.show_thinking()
+                    self.ai_worker.ponder_hit()
+                else:
+                    self.start_ai_turn()
             
-            # 重绘棋盘
-            self.draw_board()
+            self.update_stones()
     
-    def check_ai_turn(self, dt):
-        if not self.player_turn and not self.game_over:
-            # AI落子
-            ai_x, ai_y = self.ai.make_move()
-            self.game.make_move(ai_x, ai_y, 2)  # AI使用白子(2)
-            self.last_move = (ai_x, ai_y)
-            
-            # 检查游戏是否结束
-            if self.game.check_win(ai_x, ai_y, 2):
-                self.game_over = True
-                self.winner = 2
-                self.parent.update_status("AI赢了！")
-            elif self.game.is_board_full():
-                self.game_over = True
-                self.winner = 0  # 平局
-                self.parent.update_status("平局！")
-            else:
-                self.player_turn = True
-                self.parent.update_status("你的回合")
-            
-            # 重绘棋盘
-            self.draw_board()
+    def update_status(self, text):
+        """在右侧状态栏显示 text（棋盘的父控件是布局，状态栏由 App 管理）"""
+        app = App.get_running_app()
+        if app is not None:
+            app.update_status(text)
+    
+    def start_ai_turn(self):
+        """在后台线程开始AI搜索，期间状态栏保持动画"""
+        self.show_thinking()
+        self.ai_worker.start(self.game, self.on_ai_result)
+    
+    def start_pondering(self):
+        """AI落子后，按主要变例预测玩家的应对并提前搜索"""
+        pv = self.ai.pv
+        if (self.pondering and len(pv) >= 2 and pv[0] == self.last_move and
+                self.game.is_valid_move(pv[1][0], pv[1][1])):
+            self.ai_worker.start(self.game, self.on_ai_result, ponder_move=pv[1])
+    
+    def show_thinking(self):
+        self.thinking_dots = 0
+        self.update_status("AI思考中...")
+        if self.thinking_event is None:
+            self.thinking_event = Clock.schedule_interval(self.animate_thinking, 0.4)
+    
+    def animate_thinking(self, dt):
+        self.thinking_dots = (self.thinking_dots + 1) % 4
+        self.update_status("AI思考中" + "." * self.thinking_dots)
+    
+    def stop_thinking(self):
+        """取消正在进行的AI搜索并停止状态动画"""
+        if self.ai_worker is not None:
+            self.ai_worker.cancel()
+        if self.thinking_event is not None:
+            self.thinking_event.cancel()
+            self.thinking_event = None
+    
+    def on_ai_result(self, move, generation):
+        # 在工作线程中被调用，转到界面线程处理
+        Clock.schedule_once(lambda dt: self.apply_ai_move(move, generation))
+    
+    def apply_ai_move(self, move, generation):
+        # 搜索期间玩家重新开始、悔棋或换了棋盘，丢弃过期的结果
+        if (self.ai_worker is None or generation != self.ai_worker.generation or
+                self.player_turn or self.game_over):
+            return
+        self.stop_thinking()
+        
+        # AI落子
+        ai_x, ai_y = move
+        self.game.make_move(ai_x, ai_y, 2)  # AI使用白子(2)
+        self.last_move = (ai_x, ai_y)
+        
+        # 检查游戏是否结束
+        if self.game.check_win(ai_x, ai_y, 2):
+            self.game_over = True
+            self.save_record()
+            self.winner = 2
+            self.update_status("AI赢了！")
+        elif self.game.is_board_full():
+            self.game_over = True
+            self.save_record()
+            self.winner = 0  # 平局
+            self.update_status("平局！")
+        else:
+            self.player_turn = True
+            self.update_status("你的回合")
+            self.start_pondering()
+        
+        self.update_stones()
+    
+    def set_debug(self, enabled):
+        """打开或关闭棋盘左上角的搜索统计信息，关闭时AI不收集统计"""
+        if self.ai is None:
+            return  # 引擎还在载入
+        if enabled and self.debug_label is None:
+            label = Label(text='', font_size=dp(11), halign='left', valign='top',
+                          color=(1, 1, 0.6, 1), size_hint=(None, None), padding=(dp(4), dp(4)))
+            with label.canvas.before:
+                Color(0, 0, 0, 0.6)
+                background = Rectangle()
+            label.bind(texture_size=self.update_debug_layout,
+                       pos=lambda *args: setattr(background, 'pos', label.pos),
+                       size=lambda *args: setattr(background, 'size', label.size))
+            self.debug_label = label
+            self.add_widget(label)
+            self.update_debug_layout()
+            from stats import SearchStats
+            self.ai.stats = SearchStats()
+            self.ai.stats_callback = self.on_ai_stats
+        elif not enabled and self.debug_label is not None:
+            self.ai.stats_callback = None
+            self.ai.stats = None
+            self.remove_widget(self.debug_label)
+            self.debug_label = None
+    
+    def update_debug_layout(self, *args):
+        label = self.debug_label
+        if label is None:
+            return
+        # 半透明地盖在棋盘左上角
+        label.size = label.texture_size
+        label.pos = (self.x, self.top - label.height)
+    
+    def on_ai_stats(self, stats):
+        # 在工作线程中被调用，统计对象还会继续变化，先生成文字再转到界面线程
+        text = stats.summary()
+        Clock.schedule_once(lambda dt: self.update_debug(text))
+    
+    def update_debug(self, text):
+        if self.debug_label is not None:
+            self.debug_label.text = text
+    
+    def save_record(self):
+        """把下完的一局追加到应用数据目录下的对局记录文件"""
+        app = App.get_running_app()
+        if app is None or self.board_size is None:
+            return  # 对局记录不支持无限棋盘
+        try:
+            self.game.save(os.path.join(app.user_data_dir, 'games.wzr'),
+                           metadata={'black': 'player', 'white': 'ai',
+                                     'difficulty': self.ai.difficulty,
+                                     'date': time.strftime('%Y-%m-%d %H:%M')})
+        except (OSError, ValueError):
+            pass  # 保存失败不影响对局
     
     def get_board_position(self, pos):
-        x, y = pos
-        # 检查点击是否在棋盘范围内
-        if (x < self.board_margin - self.grid_size/2 or 
-            x > self.board_margin + self.grid_size * (self.board_size - 1) + self.grid_size/2 or
-            y < self.board_margin - self.grid_size/2 or 
-            y > self.board_margin + self.grid_size * (self.board_size - 1) + self.grid_size/2):
-            return None
-        
-        # 计算棋盘坐标
-        board_x = round((x - self.board_margin) / self.grid_size)
-        board_y = round((y - self.board_margin) / self.grid_size)
+        """窗口坐标 pos 最近的交叉点，在棋盘外时返回 None"""
+        x, y = self.to_board(*pos)
+        board_x = round(x)
+        board_y = round(y)
         
         # 确保坐标在有效范围内
-        if 0 <= board_x < self.board_size and 0 <= board_y < self.board_size:
+        size = self.line_count
+        if 0 <= board_x < size and 0 <= board_y < size:
             return (board_x, board_y)
         return None
     
     def reset_game(self):
+        if self.game is None:
+            if self.failed_load is not None:
+                self.load_engine(*self.failed_load)  # 上次载入失败，重试
+            return  # 引擎还在载入
+        self.stop_thinking()
         self.game.reset()
+        self.ai_worker.reset()  # 等旧的搜索线程退出后再清空 AI 的状态
         self.player_turn = True
         self.game_over = False
         self.winner = None
         self.last_move = None
-        self.parent.update_status("你的回合")
-        self.draw_board()
+        self.update_status("你的回合")
+        self.update_stones()
+        # 回到能看到整个棋盘的视图
+        self.fit_view = True
+        self.layout_trigger()
     
     def undo_move(self):
-        if len(self.game.history) >= 2 and self.player_turn and not self.game_over:
+        if self.game is None:
+            return  # 引擎还在载入
+        if not self.player_turn and not self.game_over:
+            # AI思考中：取消搜索，只撤销玩家刚下的一步
+            self.stop_thinking()
+            self.game.undo_move()
+            self.player_turn = True
+            if self.game.history:
+                self.last_move = (self.game.history[-1][0], self.game.history[-1][1])
+            else:
+                self.last_move = None
+            self.update_stones()
+            self.update_status("你的回合")
+        elif len(self.game.history) >= 2 and self.player_turn and not self.game_over:
+            self.stop_thinking()  # 停止后台思考
             self.game.undo_move()  # 撤销AI的移动
             self.game.undo_move()  # 撤销玩家的移动
             if self.game.history:
                 self.last_move = (self.game.history[-1][0], self.game.history[-1][1])
             else:
                 self.last_move = None
-            self.draw_board()
-            self.parent.update_status("你的回合")
+            self.update_stones()
+            self.update_status("你的回合")
 
 class GomokuApp(App):
     def build(self):
@@ -204,11 +609,12 @@ class GomokuApp(App):
         control_panel.add_widget(title_label)
         
         # 添加状态显示
-        self.status_label = Label(text='你的回合', font_size=18, size_hint=(1, 0.2))
+        self.status_label = Label(text='载入中...', font_size=18, size_hint=(1, 0.2))
         control_panel.add_widget(self.status_label)
         
         # 添加说明
-        info_label = Label(text='黑棋先行\n点击棋盘落子', font_size=16, size_hint=(1, 0.3))
+        info_label = Label(text='黑棋先行\n点击棋盘落子\n拖动平移，滚轮或双指缩放',
+                           font_size=16, size_hint=(1, 0.3), halign='center')
         control_panel.add_widget(info_label)
         
         # 添加难度显示
@@ -226,6 +632,14 @@ class GomokuApp(App):
         undo_button.bind(on_press=self.undo_move)
         buttons_layout.add_widget(undo_button)
         
+        self.board_button = Button(text=self.board_mode_text(), font_size=18)
+        self.board_button.bind(on_press=self.switch_board)
+        buttons_layout.add_widget(self.board_button)
+        
+        debug_button = Button(text='调试信息', font_size=18)
+        debug_button.bind(on_press=self.toggle_debug)
+        buttons_layout.add_widget(debug_button)
+        
         control_panel.add_widget(buttons_layout)
         
         # 将控制面板添加到主布局
@@ -233,6 +647,21 @@ class GomokuApp(App):
         
         return main_layout
     
+    def on_start(self):
+        # 第一帧画出之后才开始在后台载入引擎
+        Window.bind(on_flip=self.on_first_frame)
+    
+    def on_first_frame(self, *args):
+        Window.unbind(on_flip=self.on_first_frame)
+        trace_startup('first_frame')
+        self.board.load_engine(self.board.board_size, self.on_engine_ready)
+    
+    def on_engine_ready(self):
+        trace_startup('engine_ready')
+        self.update_status('你的回合')
+        if STARTUP_TRACE:
+            self.stop()
+    
     def update_status(self, text):
         self.status_label.text = text
     
@@ -241,6 +670,22 @@ class GomokuApp(App):
     
     def undo_move(self, instance):
         self.board.undo_move()
+    
+    def toggle_debug(self, instance):
+        self.board.set_debug(self.board.debug_label is None)
+    
+    def board_mode_text(self):
+        size = self.board.board_size
+        return f'棋盘：{size}路' if size else '棋盘：无限'
+    
+    def switch_board(self, instance):
+        """依次切换 BOARD_MODES 中的棋盘"""
+        index = BOARD_MODES.index(self.board.board_size)
+        self.board.set_board_size(BOARD_MODES[(index + 1) % len(BOARD_MODES)],
+                                  self.on_board_switched)
+    
+    def on_board_switched(self):
+        self.board_button.text = self.board_mode_text()
 
 if __name__ == '__main__':
     GomokuApp().run()
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""多进程根节点并行搜索
+
+把根节点走法轮流分给 ProcessPoolExecutor 中的各个进程，每个进程在自己的
+Game 副本上对分到的走法做迭代加深搜索。各进程通过共享内存交换每个深度的
+根节点 alpha，并遵守同一个截止时间。
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ai import AI
+
+# 工作进程内复用的 AI（保留置换表），以及它所属的对局编号
+_worker_ai = None
+_worker_epoch = None
+_shared_alpha = None
+
+
+def _init_worker(shared_alpha):
+    global _shared_alpha
+    _shared_alpha = shared_alpha
+
+
+def _search_moves(game_class, snapshot, root_moves, options, epoch, deadline):
+    """工作进程：在局面副本上搜索 root_moves，返回每轮迭代的结果"""
+    global _worker_ai, _worker_epoch
+    game = game_class.from_snapshot(snapshot)
+    board_size = game.board_size
+    
+    if _worker_ai is None or _worker_ai.game.board_size != board_size:
+        _worker_ai = AI(game, **options)
+    ai = _worker_ai
+    ai.game = game
+    if epoch != _worker_epoch:
+        ai.reset()
+        _worker_epoch = epoch
+    ai.shared_alpha = _shared_alpha
+    if ai.stats is not None:
+        ai.stats.reset()
+    
+    start_time = time.time()
+    ai.time_limit = max(0.01, deadline - start_time)
+    ai._iterative_deepening(list(root_moves), start_time)
+    return ai.iterations, ai.nodes, ai.stats
+
+
+class ParallelAI(AI):
+    """把全宽搜索分给多个进程的 AI，接口与 AI 相同
+    
+    开局、成五挡四和威胁空间搜索仍在本进程完成，只有迭代加深部分并行。
+    每个进程只搜索一部分根节点走法，最终在所有进程都完成的最大深度上取分数
+    最高的走法。
+    """
+    
+    def __init__(self, game, workers=None, **options):
+        super().__init__(game, **options)
+        self.workers = workers or multiprocessing.cpu_count()
+        # 回调不能传给其他进程，各进程的统计随结果返回后合并
+        self.options = dict(options, threat_search=False, book=None, stats_callback=None,
+                            collect_stats=self.stats is not None)
+        self.nps = 0  # 最近一次搜索每秒的节点数（所有进程合计）
+        self._epoch = 0
+        self._executor = None
+        self._shared_alpha = None
+    
+    def reset(self):
+        """新开一局：本进程和各工作进程的置换表都会清空"""
+        super().reset()
+        self._epoch += 1
+    
+    def close(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+    
+    def _pool(self):
+        if self._executor is None:
+            self._shared_alpha = multiprocessing.Array('d', self.max_depth + 1)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self._shared_alpha,))
+        return self._executor
+    
+    def _iterative_deepening(self, root_moves, start_time):
+        """把根节点走法轮流分给各进程并行搜索"""
+        executor = self._pool()
+        workers = min(self.workers, len(root_moves))
+        for depth in range(len(self._shared_alpha)):
+            self._shared_alpha[depth] = float('-inf')
+        
+        snapshot = self.game.snapshot()
+        deadline = start_time + self.time_limit
+        futures = [
+            executor.submit(_search_moves, type(self.game), snapshot,
+                            root_moves[i::workers], self.options, self._epoch, deadline)
+            for i in range(workers)
+        ]
+        results = [future.result() for future in futures]
+        elapsed = max(time.time() - start_time, 1e-6)
+        
+        self.nodes = sum(nodes for _, nodes, _ in results)
+        self.nps = self.nodes / elapsed
+        self.depth_reached = min(len(iterations) for iterations, _, _ in results)
+        stats = self.stats
+        if stats is not None:
+            for _, _, worker_stats in results:
+                if worker_stats is not None:
+                    stats.merge(worker_stats)
+        if self.depth_reached == 0:
+            self.iterations = []
+            return root_moves[0]
+        
+        # 在所有进程都完成的最大深度上，取分数最高的走法，分数相同时优先精确值
+        reports = [iterations[self.depth_reached - 1] for iterations, _, _ in results]
+        depth, move, score, exact, _ = max(reports, key=lambda r: (r[2], r[3]))
+        self.best_score = score
+        self.iterations = [(depth, move, score, exact, elapsed)]
+        self.pv = [move]
+        if stats is not None:
+            self._report_iteration(stats, start_time)
+        return move
@@ -0,0 +1,256 @@
+"""Gomocup（Piskvork）协议引擎
+
+通过标准输入输出与比赛管理程序通信，可以在 Piskvork、Gomocup 等管理程序下
+与其他引擎对局。不导入 Kivy，启动很快。
+
+支持的命令：START、RESTART、BEGIN、TURN、BOARD、TAKEBACK、INFO、ABOUT、END。
+INFO 中的 timeout_turn、timeout_match、time_left 决定每步的思考时间，
+max_memory 决定置换表的大小；只支持自由规则（五连及长连都算胜），
+rule 等其他 INFO 项被忽略。
+
+用法：
+    python pbrain.py [--difficulty 3] [--no-book]
+"""
+import argparse
+import sys
+import time
+
+from ai import AI
+from book import OpeningBook
+from game import Game
+from transposition import TranspositionTable
+
+ABOUT = 'name="wuziqi", version="0.1", author="wuziqi", country="CN"'
+
+# 支持的棋盘大小
+MIN_BOARD_SIZE = 5
+MAX_BOARD_SIZE = 64
+
+# 没有收到时间限制时每步的思考时间(秒)
+DEFAULT_TURN_TIME = 5.0
+# 每步至少使用的时间(秒)，timeout_turn=0 表示尽快落子
+MIN_TURN_TIME = 0.05
+# 留给通信和搜索超时检查的余量：预算乘以 TIME_SAFETY_RATIO 再减去 TIME_MARGIN 秒
+TIME_SAFETY_RATIO = 0.9
+TIME_MARGIN = 0.05
+# 按整局时间分配时，至少按还要再下这么多步来计算
+MIN_MOVES_LEFT = 15
+
+# 置换表大小(MB)：没有内存限制时的默认值，以及有限制时留给解释器和其他数据的内存
+DEFAULT_TT_MB = 32
+RESERVED_MEMORY_MB = 80
+
+
+class ProtocolEngine:
+    """处理 Gomocup 协议命令，在同一局的各回合之间复用 AI（含置换表）"""
+    
+    def __init__(self, difficulty=3, use_book=True, out=None):
+        self.difficulty = difficulty
+        self.book = OpeningBook.open_default() if use_book else None
+        self.out = out or sys.stdout
+        self.game = None
+        self.ai = None
+        self.own = None  # 本引擎执子（1=先手，2=后手），在第一次落子时确定
+        self.running = True
+        # 管理程序发来的限制，None 表示没有收到
+        self.timeout_turn = None  # 毫秒
+        self.timeout_match = 0    # 毫秒，0 表示不限
+        self.time_left = None     # 毫秒
+        self.max_memory = 0       # 字节，0 表示不限
+        self._board_lines = None  # BOARD 命令收集中的棋子行
+    
+    def send(self, line):
+        self.out.write(line + '\n')
+        self.out.flush()
+    
+    def run(self, lines):
+        """逐行处理命令，直到 END 或输入结束"""
+        for line in lines:
+            self.handle(line)
+            if not self.running:
+                break
+    
+    def handle(self, line):
+        line = line.strip()
+        if not line:
+            return
+        if self._board_lines is not None:
+            if line.upper() != 'DONE':
+                self._board_lines.append(line)
+                return
+            handler, argument = self._finish_board, ''
+        else:
+            command, _, argument = line.partition(' ')
+            handler = getattr(self, 'cmd_' + command.lower(), None)
+            if handler is None:
+                self.send('UNKNOWN ' + command.upper())
+                return
+        try:
+            handler(argument.strip())
+        except ValueError as error:
+            self.send(f'ERROR {error}')
+    
+    def cmd_start(self, argument):
+        size = int(argument)
+        if not MIN_BOARD_SIZE <= size <= MAX_BOARD_SIZE:
+            raise ValueError(f'unsupported board size {size}')
+        if self.game is None or self.game.board_size != size:
+            self.game = Game(size)
+            self.ai = None
+        self._new_game()
+        self.send('OK')
+    
+    def cmd_rectstart(self, argument):
+        raise ValueError('rectangular boards are not supported')
+    
+    def cmd_restart(self, argument):
+        self._require_game()
+        self._new_game()
+        self.send('OK')
+    
+    def cmd_begin(self, argument):
+        self._require_game()
+        if self.game.history:
+            raise ValueError('BEGIN on a non-empty board')
+        self.own = 1
+        self._play()
+    
+    def cmd_turn(self, argument):
+        self._require_game()
+        x, y = self._parse_move(argument)
+        if self.own is None:
+            # 对手先落下这一步，因此按落子前的步数判断双方执子
+            self.own = 2 - len(self.game.history) % 2
+        if not self.game.make_move(x, y, 3 - self.own):
+            raise ValueError(f'invalid move {x},{y}')
+        self._play()
+    
+    def cmd_board(self, argument):
+        self._require_game()
+        self._board_lines = []
+    
+    def _finish_board(self, argument):
+        lines, self._board_lines = self._board_lines, None
+        stones = []
+        for line in lines:
+            try:
+                x, y, field = (int(part) for part in line.split(','))
+            except ValueError:
+                raise ValueError(f'bad BOARD line {line!r}') from None
+            if field in (1, 2):
+                stones.append((x, y, field))
+        
+        # 双方子数相同时本引擎先手，否则后手；棋子按收到的顺序落下
+        own_count = sum(1 for _, _, field in stones if field == 1)
+        self.own = 1 if own_count * 2 == len(stones) else 2
+        self.game.reset()
+        for x, y, field in stones:
+            player = self.own if field == 1 else 3 - self.own
+            if not self.game.make_move(x, y, player):
+                raise ValueError(f'invalid move {x},{y}')
+        self._play()
+    
+    def cmd_takeback(self, argument):
+        self._require_game()
+        x, y = self._parse_move(argument)
+        game = self.game
+        if not game.history or game.is_valid_move(x, y):
+            raise ValueError(f'no stone at {x},{y}')
+        if game.last_move() == (x, y):
+            game.undo_move()
+        else:
+            # 不是最后一步时按原顺序重放其余的棋子
+            moves = [(mx, my, int(game.board[my][mx])) for mx, my in game.history
+                     if (mx, my) != (x, y)]
+            game.reset()
+            for mx, my, player in moves:
+                game.make_move(mx, my, player)
+        self.send('OK')
+    
+    def cmd_info(self, argument):
+        key, _, value = argument.partition(' ')
+        key = key.lower()
+        if key == 'timeout_turn':
+            self.timeout_turn = int(value)
+        elif key == 'timeout_match':
+            self.timeout_match = int(value)
+        elif key == 'time_left':
+            self.time_left = int(value)
+        elif key == 'max_memory':
+            self.max_memory = int(value)
+            if self.ai is not None:
+                size = self.ai.game.board_size
+                self.ai.tt = TranspositionTable(self._tt_size_mb(), size * size)
+        # 其他 INFO 项不需要回复
+    
+    def cmd_about(self, argument):
+        self.send(ABOUT)
+    
+    def cmd_end(self, argument):
+        self.running = False
+    
+    def _require_game(self):
+        if self.game is None:
+            raise ValueError('START has not been received')
+    
+    def _new_game(self):
+        self.game.reset()
+        self.own = None
+        if self.ai is not None:
+            self.ai.reset()
+    
+    @staticmethod
+    def _parse_move(argument):
+        try:
+            x, y = (int(part) for part in argument.split(','))
+        except ValueError:
+            raise ValueError(f'bad move {argument!r}') from None
+        return x, y
+    
+    def _tt_size_mb(self):
+        if self.max_memory <= 0:
+            return DEFAULT_TT_MB
+        available = self.max_memory / (1024 * 1024) - RESERVED_MEMORY_MB
+        return max(1, min(DEFAULT_TT_MB, available / 2))
+    
+    def turn_time(self):
+        """本步的思考时间(秒)：取单步限制和整局剩余时间平均分配中较小的一个"""
+        limits = []
+        if self.timeout_turn is not None:
+            limits.append(self.timeout_turn / 1000)
+        if self.timeout_match > 0 and self.time_left is not None:
+            empty = self.game.board_size ** 2 - len(self.game.history)
+            moves_left = max(MIN_MOVES_LEFT, empty // 2)
+            limits.append(self.time_left / 1000 / moves_left)
+        budget = min(limits) if limits else DEFAULT_TURN_TIME
+        return max(MIN_TURN_TIME, budget * TIME_SAFETY_RATIO - TIME_MARGIN)
+    
+    def _play(self):
+        """为本引擎选出一步，落子并输出"""
+        if self.ai is None or self.ai.player != self.own:
+            # 执子改变时置换表中的分数方向也不同，需要新的 AI
+            self.ai = AI(self.game, difficulty=self.difficulty, tt_size_mb=self._tt_size_mb(),
+                         book=self.book, player=self.own)
+        ai = self.ai
+        ai.time_limit = self.turn_time()
+        start = time.time()
+        x, y = ai.make_move()
+        if not self.game.make_move(x, y, self.own):
+            raise ValueError(f'engine chose an invalid move {x},{y}')
+        if ai.depth_reached:
+            self.send(f'MESSAGE depth {ai.depth_reached} score {ai.best_score:g} '
+                      f'nodes {ai.nodes} time {time.time() - start:.2f}s')
+        self.send(f'{x},{y}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gomocup 协议五子棋引擎')
+    parser.add_argument('--difficulty', type=int, default=3, choices=(1, 2, 3))
+    parser.add_argument('--no-book', action='store_true', help='不使用开局库')
+    args = parser.parse_args()
+    engine = ProtocolEngine(args.difficulty, use_book=not args.no_book)
+    engine.run(sys.stdin)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""二进制对局记录
+
+对局记录文件由一个文件头和依次排列的对局组成，可以不断追加。读取时用 mmap
+映射整个文件，逐局解析头部；按结果或手数过滤时只读头部，不触及走法数据，
+因此几 GB 的文件也不会读入内存。走法以 memoryview 的形式直接指向映射的文件，
+重放到 Game 时不复制。
+
+文件格式（小端）：
+    文件头  magic(4s) version(H) reserved(H)
+    对局    board_size(B) result(B) cell_bytes(B) reserved(B) move_count(H) metadata_length(H)
+            metadata（UTF-8 JSON，可为空） moves（move_count 个格子编号）
+格子编号为 y * board_size + x，黑先、双方交替。每个编号占 cell_bytes 个字节：
+格子数不超过256（棋盘不超过16路）时为1字节，更大的棋盘（如19路）为2字节。
+
+用法：
+    python records.py GAMES.wzr [--result black|white|draw|unknown] [--min-moves N]
+列出文件中符合条件的对局。
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'WZQR'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+RECORD_HEADER = struct.Struct('<BBBBHH')
+
+# 对局结果
+RESULT_UNKNOWN = 0  # 未下完
+RESULT_BLACK = 1    # 黑胜
+RESULT_WHITE = 2    # 白胜
+RESULT_DRAW = 3     # 和棋
+RESULT_NAMES = {'unknown': RESULT_UNKNOWN, 'black': RESULT_BLACK,
+                'white': RESULT_WHITE, 'draw': RESULT_DRAW}
+
+
+def cell_bytes(board_size):
+    """每个格子编号占用的字节数"""
+    return 1 if board_size * board_size <= 256 else 2
+
+
+def encode_record(board_size, moves, result=RESULT_UNKNOWN, metadata=None):
+    """把一局棋编码为记录（不含文件头）
+    
+    moves 为按顺序的格子编号，可以是 Game.moves。metadata 为可 JSON 序列化的字典。
+    """
+    width = cell_bytes(board_size)
+    if width == 1:
+        packed = array('B', moves).tobytes()
+    else:
+        packed = array('H', moves)
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        packed = packed.tobytes()
+    meta = json.dumps(metadata, ensure_ascii=False).encode('utf-8') if metadata else b''
+    count = len(packed) // width
+    if count > 0xFFFF or len(meta) > 0xFFFF:
+        raise ValueError("对局或附加信息太长，无法保存")
+    return RECORD_HEADER.pack(board_size, result, width, 0, count, len(meta)) + meta + packed
+
+
+class GameRecord:
+    """文件中的一局棋
+    
+    moves 是指向文件映射的 memoryview，按下标得到格子编号；文件关闭前需要
+    release()，或者用 copy_moves() 取得独立的副本。
+    """
+    __slots__ = ('board_size', 'result', 'offset', 'moves', '_metadata')
+    
+    def __init__(self, board_size, result, offset, moves, metadata):
+        self.board_size = board_size
+        self.result = result
+        self.offset = offset  # 记录在文件中的位置
+        self.moves = moves
+        self._metadata = metadata
+    
+    def __len__(self):
+        return len(self.moves)
+    
+    @property
+    def metadata(self):
+        """附加信息字典（读取时才解析）"""
+        return json.loads(bytes(self._metadata).decode('utf-8')) if len(self._metadata) else {}
+    
+    def coords(self):
+        """按顺序返回每一步的 (x, y)"""
+        size = self.board_size
+        return [(index % size, index // size) for index in self.moves]
+    
+    def copy_moves(self):
+        """把走法复制为 array('H')，不再依赖文件映射"""
+        return array('H', self.moves)
+    
+    def replay(self, game, plies=None):
+        """在空的 game 上按顺序重放前 plies 步（默认全部），返回 game"""
+        if game.board_size != self.board_size:
+            raise ValueError(f"记录的棋盘大小 {self.board_size} 与 Game 的 {game.board_size} 不同")
+        size = self.board_size
+        moves = self.moves if plies is None else self.moves[:plies]
+        for ply, index in enumerate(moves):
+            if not game.make_move(index % size, index // size, 1 + ply % 2):
+                raise ValueError(f"记录中第 {ply + 1} 步不合法")
+        return game
+    
+    def release(self):
+        self.moves.release()
+        self._metadata.release()
+
+
+def _moves_view(view, width):
+    if width == 1:
+        return view
+    if sys.byteorder != 'little':
+        moves = array('H', view)
+        moves.byteswap()
+        return memoryview(moves)
+    return view.cast('H')
+
+
+class RecordReader:
+    """用 mmap 流式读取对局记录文件
+    
+    for record in reader.filter(result=RESULT_BLACK, min_moves=20): ...
+    也可以用作 with 语句的上下文管理器。
+    """
+    
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path} 不是对局记录文件")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} 不是对局记录文件")
+        self._view = memoryview(self._map)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def __iter__(self):
+        return self.filter()
+    
+    def filter(self, result=None, min_moves=0, max_moves=None, board_size=None):
+        """逐局返回符合条件的 GameRecord
+        
+        result 可以是单个结果或结果的集合；条件只用记录头判断，不符合的对局
+        不会创建任何对象。
+        """
+        if isinstance(result, int):
+            result = (result,)
+        data = self._map
+        view = self._view
+        end = len(data)
+        offset = HEADER.size
+        unpack = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        while offset < end:
+            size, record_result, width, _, count, meta_length = unpack(data, offset)
+            start = offset + header_size
+            moves_start = start + meta_length
+            next_offset = moves_start + count * width
+            if next_offset > end:
+                raise ValueError(f"记录在位置 {offset} 处被截断")
+            if ((result is None or record_result in result) and count >= min_moves and
+                    (max_moves is None or count <= max_moves) and
+                    (board_size is None or size == board_size)):
+                yield GameRecord(size, record_result, offset,
+                                 _moves_view(view[moves_start:next_offset], width),
+                                 view[start:moves_start])
+            offset = next_offset
+    
+    def close(self):
+        """关闭文件；仍有未 release() 的记录时，映射在这些记录被回收后才释放"""
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        try:
+            self._map.close()
+        except BufferError:
+            # 还有记录引用着映射，等它们被回收时映射会自动释放
+            pass
+        self._file.close()
+
+
+class RecordWriter:
+    """向对局记录文件追加对局，文件不存在时先写入文件头"""
+    
+    def __init__(self, path):
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(MAGIC, VERSION, 0))
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def write(self, board_size, moves, result=RESULT_UNKNOWN, metadata=None):
+        self._file.write(encode_record(board_size, moves, result, metadata))
+    
+    def close(self):
+        self._file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列出对局记录文件中的对局')
+    parser.add_argument('path')
+    parser.add_argument('--result', choices=sorted(RESULT_NAMES))
+    parser.add_argument('--min-moves', type=int, default=0)
+    parser.add_argument('--max-moves', type=int)
+    args = parser.parse_args()
+    
+    names = {value: key for key, value in RESULT_NAMES.items()}
+    result = RESULT_NAMES[args.result] if args.result else None
+    total = 0
+    with RecordReader(args.path) as reader:
+        for record in reader.filter(result, args.min_moves, args.max_moves):
+            total += 1
+            moves = ' '.join(f'{x},{y}' for x, y in record.coords())
+            print(f"{record.board_size}路 {names[record.result]} {len(record)}手 "
+                  f"{record.metadata} {moves}")
+            record.release()
+    print(f"共 {total} 局")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""无界面的AI自对弈
+
+在进程池中并行进行两组AI设置之间的对局，随机开局并交换先后手，
+结果边完成边输出，最后给出Elo差（含95%置信区间）和每秒对局数。
+
+用法：
+    python selfplay.py --games 1000 --workers 8 \\
+        --a "difficulty=3,time_limit=0.2" \\
+        --b "difficulty=3,time_limit=0.2,dynamic_ordering=False"
+"""
+import argparse
+import ast
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ai import AI
+from game import Game
+from records import RESULT_BLACK, RESULT_DRAW, RESULT_WHITE, RecordWriter
+
+RESULT_NAMES = {1.0: '胜', 0.5: '和', 0.0: '负'}
+
+
+def parse_options(text):
+    """把 "key=value,key=value" 解析成 AI 的参数字典"""
+    options = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        key, value = item.split('=', 1)
+        try:
+            options[key.strip()] = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            options[key.strip()] = value.strip()
+    return options
+
+
+def random_opening(board_size, stones, rnd):
+    """在天元附近随机摆出 stones 个黑白交替的棋子"""
+    center = board_size // 2
+    cells = [(center + dx, center + dy) for dx in range(-2, 3) for dy in range(-2, 3)]
+    return rnd.sample(cells, stones)
+
+
+def play_game(index, opening, a_options, b_options, a_is_black, board_size, seed):
+    """进行一局对弈，返回结果字典；a_score 为 A 方得分（胜1，和0.5，负0）"""
+    random.seed(seed)
+    start = time.time()
+    game = Game(board_size)
+    a_player = 1 if a_is_black else 2
+    ais = {
+        a_player: AI(game, player=a_player, **a_options),
+        3 - a_player: AI(game, player=3 - a_player, **b_options),
+    }
+    
+    for ply, (x, y) in enumerate(opening):
+        game.make_move(x, y, 1 + ply % 2)
+    
+    winner = 0
+    while not game.is_board_full():
+        player = 1 + len(game.history) % 2
+        x, y = ais[player].make_move()
+        game.make_move(x, y, player)
+        if game.check_win(x, y, player):
+            winner = player
+            break
+    
+    if winner == 0:
+        a_score = 0.5
+    else:
+        a_score = 1.0 if winner == a_player else 0.0
+    return {
+        'index': index,
+        'a_is_black': a_is_black,
+        'winner': winner,
+        'a_score': a_score,
+        'moves': list(game.history),
+        'seconds': time.time() - start,
+    }
+
+
+def elo_difference(pair_scores, z=1.96):
+    """根据每对对局（同一开局交换先后手）A 方的平均得分计算 Elo 差及置信区间 (elo, low, high)
+    
+    同一开局的两局相关性很强，以对为单位估计方差。区间用 Wilson 形式：把得分率 p
+    处的方差写成 d * p(1 - p)，d 为得分的离散程度（和棋多时小于1），估计时加入
+    两对虚拟对局向1收缩，因此对数很少或全胜全负时区间也不会退化成一个点。
+    """
+    n = len(pair_scores)
+    mean = sum(pair_scores) / n
+    # 平滑后的得分率只用于估计离散程度
+    smoothed = (sum(pair_scores) + 1) / (n + 2)
+    bernoulli = smoothed * (1 - smoothed)
+    squares = sum((s - mean) ** 2 for s in pair_scores)
+    dispersion = (squares + 2 * bernoulli) / ((n - 1 + 2) * bernoulli)
+    n_eff = n / dispersion
+    
+    # Wilson 区间：解 (mean - p)^2 = z^2 * p(1 - p) / n_eff
+    z2 = z * z / n_eff
+    center = (mean + z2 / 2) / (1 + z2)
+    margin = z / (1 + z2) * math.sqrt(mean * (1 - mean) / n_eff + z2 / (4 * n_eff))
+    
+    def to_elo(p):
+        p = min(max(p, 1e-3), 1 - 1e-3)
+        return -400 * math.log10(1 / p - 1)
+    
+    return to_elo(mean), to_elo(center - margin), to_elo(center + margin)
+
+
+def pair_scores(results):
+    """把 {对局编号: A 方得分} 按开局配对（编号 2k 与 2k+1），返回每对的平均得分"""
+    pairs = {}
+    for index, score in results.items():
+        pairs.setdefault(index // 2, []).append(score)
+    return [sum(scores) / len(scores) for scores in pairs.values()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI自对弈')
+    parser.add_argument('--games', type=int, default=100, help='对局数（按开局成对，取偶数）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--a', default='difficulty=3,time_limit=0.2', help='A 方的AI参数')
+    parser.add_argument('--b', default='difficulty=3,time_limit=0.2', help='B 方的AI参数')
+    parser.add_argument('--size', type=int, default=15)
+    parser.add_argument('--opening', type=int, default=3, help='随机开局的棋子数')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='把每局的走法写入文件（可用于 book.py extend）')
+    parser.add_argument('--records', help='把每局追加到二进制对局记录文件（见 records.py）')
+    args = parser.parse_args()
+    
+    a_options = parse_options(args.a)
+    b_options = parse_options(args.b)
+    rnd = random.Random(args.seed)
+    pairs = (args.games + 1) // 2
+    
+    start = time.time()
+    scores = []
+    results = {}  # 对局编号 -> A 方得分，用于按开局配对
+    out = open(args.out, 'w') if args.out else None
+    records = RecordWriter(args.records) if args.records else None
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = []
+        for pair in range(pairs):
+            # 同一个开局下两局，交换先后手
+            opening = random_opening(args.size, args.opening, rnd)
+            for a_is_black in (True, False):
+                index = len(futures)
+                futures.append(executor.submit(play_game, index, opening, a_options, b_options,
+                                               a_is_black, args.size, args.seed * 100003 + index))
+        
+        for future in as_completed(futures):
+            result = future.result()
+            scores.append(result['a_score'])
+            results[result['index']] = result['a_score']
+            wins = scores.count(1.0)
+            draws = scores.count(0.5)
+            losses = scores.count(0.0)
+            print(f"#{result['index']:<5} A执{'黑' if result['a_is_black'] else '白'} "
+                  f"{RESULT_NAMES[result['a_score']]} "
+                  f"{len(result['moves'])}手 {result['seconds']:.1f}s | "
+                  f"A {wins}胜 {draws}和 {losses}负", flush=True)
+            if out:
+                out.write(' '.join(f'{x},{y}' for x, y in result['moves']) + '\n')
+            if records:
+                winner = {0: RESULT_DRAW, 1: RESULT_BLACK, 2: RESULT_WHITE}[result['winner']]
+                a, b = (args.a, args.b) if result['a_is_black'] else (args.b, args.a)
+                records.write(args.size, [y * args.size + x for x, y in result['moves']], winner,
+                              {'black': a, 'white': b, 'seed': args.seed, 'index': result['index']})
+    if out:
+        out.close()
+    if records:
+        records.close()
+    
+    elapsed = time.time() - start
+    elo, low, high = elo_difference(pair_scores(results))
+    print(f"共 {len(scores)} 局，用时 {elapsed:.1f}s，{len(scores) / elapsed:.2f} 局/秒")
+    print(f"A 相对 B 的 Elo 差: {elo:+.0f} (95% 置信区间 {low:+.0f} ~ {high:+.0f})")
+
+
+if __name__ == '__main__':
+    main()
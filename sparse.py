@@ -0,0 +1,334 @@
+"""稀疏棋盘
+
+SparseGame 只保存已经落下的棋子（格子编号 -> 玩家的字典），五连窗口的计数
+也只为有棋子的窗口保存，因此内存和每步的开销只与棋子数有关，与棋盘面积无关。
+可以用于很大的棋盘，board_size=None 时为无限棋盘（实际为 UNBOUNDED_SIZE 路，
+从中心开始下，碰不到边界）。
+
+公开接口与 Game 相同，AI、威胁搜索和后台搜索可以直接使用。不同之处：
+没有 board 数组（用 piece_at() 查询格子）；get_valid_moves() 只返回已有棋子
+周围的空位，空棋盘时返回中心；不支持对局记录的保存。
+"""
+from array import array
+
+from game import LINE_SCORES, MoveHistory
+
+# 无限棋盘实际使用的边长，格子编号 y * UNBOUNDED_SIZE + x 不超过 2**30
+UNBOUNDED_SIZE = 1 << 15
+
+# 水平、垂直、对角线、反对角线
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+_MASK64 = (1 << 64) - 1
+_ZOBRIST_SEED = 20240601
+
+
+def zobrist_key(player, index):
+    """格子 index 上 player 棋子的 Zobrist 随机数（splitmix64，按需计算，不建表）"""
+    z = ((index << 1 | (player - 1)) + _ZOBRIST_SEED) * 0x9E3779B97F4A7C15 & _MASK64
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & _MASK64
+    return z ^ (z >> 31)
+
+
+class SparseCoords:
+    """格子编号到 (x, y) 的换算，代替 Game 中预先生成的坐标表"""
+    __slots__ = ('size',)
+    
+    def __init__(self, size):
+        self.size = size
+    
+    def __getitem__(self, index):
+        return index % self.size, index // self.size
+
+
+# 每种棋盘大小下按需计算并缓存的表（只包含下过棋或当过候选点的格子）：
+# 经过某格的窗口编号，以及某格周围2格内的格子编号
+_WINDOW_CACHE = {}
+_NEIGHBOR_CACHE = {}
+
+
+class SparseGame:
+    # 窗口编号为 起点格子编号 * 4 + 方向，只有窗口完全在棋盘内时才存在
+    __slots__ = ('board_size', 'unbounded', 'cells', 'moves', 'history', 'hash', 'candidates',
+                 '_coords', '_steps', '_window_cache', '_neighbor_cache', '_window_counts',
+                 '_pure', '_scores', '_neighbor_counts')
+    
+    def __init__(self, board_size=None):
+        self.unbounded = board_size is None
+        self.board_size = UNBOUNDED_SIZE if board_size is None else board_size
+        size = self.board_size
+        self._coords = SparseCoords(size)
+        # 每个方向上相邻格子的编号差
+        self._steps = tuple(dy * size + dx for dx, dy in DIRECTIONS)
+        self._window_cache = _WINDOW_CACHE.setdefault(size, {})
+        self._neighbor_cache = _NEIGHBOR_CACHE.setdefault(size, {})
+        self.reset()
+    
+    def reset(self):
+        """重置游戏状态"""
+        self.cells = {}  # 格子编号 -> 玩家
+        self.moves = array('L')
+        self.history = MoveHistory(self.moves, self.board_size, self._coords)
+        # 有棋子的窗口内双方的棋子数：窗口编号 -> 子数（为0时删除）
+        self._window_counts = [None, {}, {}]
+        # 只有一方棋子的窗口：_pure[player][子数] 为窗口编号的集合，用于查找威胁点
+        self._pure = [None, [set() for _ in range(6)], [set() for _ in range(6)]]
+        self._scores = [0, 0, 0]
+        self.hash = 0
+        self._neighbor_counts = {}
+        self.candidates = set()
+    
+    def copy(self):
+        """复制当前局面（包括落子顺序），副本与原对象互不影响"""
+        game = type(self)(None if self.unbounded else self.board_size)
+        game.restore(self.snapshot())
+        return game
+    
+    def snapshot(self):
+        """返回局面的紧凑快照 (board_size, 每步的玩家, 落子顺序字节)，无限棋盘的 board_size 为 None"""
+        cells = self.cells
+        return (None if self.unbounded else self.board_size,
+                bytes(cells[index] for index in self.moves), self.moves.tobytes())
+    
+    def restore(self, snapshot):
+        """还原 snapshot() 保存的局面"""
+        board_size, players, moves = snapshot
+        if (board_size is None) != self.unbounded or (board_size and board_size != self.board_size):
+            raise ValueError("快照的棋盘大小与当前棋盘不同")
+        self.reset()
+        coords = self._coords
+        for index, player in zip(array('L', moves), players):
+            x, y = coords[index]
+            self.make_move(x, y, player)
+    
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """由 snapshot() 保存的快照创建新局面"""
+        game = cls(snapshot[0])
+        game.restore(snapshot)
+        return game
+    
+    def __reduce__(self):
+        return (type(self).from_snapshot, (self.snapshot(),))
+    
+    def _windows_at(self, index):
+        """经过格子 index、完全在棋盘内的窗口编号（最多20个）"""
+        windows = self._window_cache.get(index)
+        if windows is None:
+            size = self.board_size
+            x, y = index % size, index // size
+            windows = []
+            for direction, (dx, dy) in enumerate(DIRECTIONS):
+                for k in range(5):
+                    sx, sy = x - k * dx, y - k * dy
+                    ex, ey = sx + 4 * dx, sy + 4 * dy
+                    if (0 <= sx < size and 0 <= ex < size and
+                            0 <= sy < size and 0 <= ey < size):
+                        windows.append((sy * size + sx) * 4 + direction)
+            windows = tuple(windows)
+            self._window_cache[index] = windows
+        return windows
+    
+    def _window_cells(self, w):
+        step = self._steps[w & 3]
+        start = w >> 2
+        return (start, start + step, start + 2 * step, start + 3 * step, start + 4 * step)
+    
+    def is_valid_move(self, x, y):
+        """检查移动是否有效"""
+        size = self.board_size
+        if x < 0 or x >= size or y < 0 or y >= size:
+            return False
+        return y * size + x not in self.cells
+    
+    def piece_at(self, x, y):
+        """(x, y) 上的棋子：0=空，1=黑，2=白"""
+        return self.cells.get(y * self.board_size + x, 0)
+    
+    def make_move(self, x, y, player):
+        """在指定位置落子"""
+        if self.is_valid_move(x, y):
+            index = y * self.board_size + x
+            self.cells[index] = player
+            self.moves.append(index)
+            self._update_windows(index, player, 1)
+            self.hash ^= zobrist_key(player, index)
+            self._add_neighbors(index)
+            return True
+        return False
+    
+    def undo_move(self):
+        """撤销最后一步移动"""
+        if self.moves:
+            index = self.moves.pop()
+            player = self.cells.pop(index)
+            self._update_windows(index, player, -1)
+            self.hash ^= zobrist_key(player, index)
+            self._remove_neighbors(index)
+            return True
+        return False
+    
+    def last_move(self):
+        """最后一步的坐标 (x, y)，还没有落子时返回 None"""
+        moves = self.moves
+        return self._coords[moves[-1]] if moves else None
+    
+    def _update_windows(self, index, player, delta):
+        """增量更新经过格子 index 的窗口计数和双方总分"""
+        counts = self._window_counts[player]
+        opponent_counts = self._window_counts[3 - player]
+        pure = self._pure[player]
+        opponent_pure = self._pure[3 - player]
+        player_change = 0
+        opponent_change = 0
+        
+        for w in self._windows_at(index):
+            old = counts.get(w, 0)
+            new = old + delta
+            other = opponent_counts.get(w, 0)
+            player_change += LINE_SCORES[new][other] - LINE_SCORES[old][other]
+            opponent_change += LINE_SCORES[other][new] - LINE_SCORES[other][old]
+            if new:
+                counts[w] = new
+            else:
+                del counts[w]
+            # 维护只有一方棋子的窗口集合
+            if other == 0:
+                if old:
+                    pure[old].discard(w)
+                if new:
+                    pure[new].add(w)
+            elif old == 0:
+                opponent_pure[other].discard(w)
+            elif new == 0:
+                opponent_pure[other].add(w)
+        
+        self._scores[player] += player_change
+        self._scores[3 - player] += opponent_change
+    
+    def _add_neighbors(self, index):
+        """落子后更新候选点：该格不再是候选点，周围2格内的空位计数加一"""
+        self.candidates.discard(index)
+        counts = self._neighbor_counts
+        cells = self.cells
+        for n in self._neighbors(index):
+            count = counts.get(n, 0) + 1
+            counts[n] = count
+            if count == 1 and n not in cells:
+                self.candidates.add(n)
+    
+    def _remove_neighbors(self, index):
+        """悔棋后更新候选点：周围计数减一，清空的格子重新成为候选点"""
+        counts = self._neighbor_counts
+        for n in self._neighbors(index):
+            count = counts[n] - 1
+            if count:
+                counts[n] = count
+            else:
+                del counts[n]
+                self.candidates.discard(n)
+        if index in counts:
+            self.candidates.add(index)
+    
+    def _neighbors(self, index):
+        neighbors = self._neighbor_cache.get(index)
+        if neighbors is None:
+            size = self.board_size
+            x, y = index % size, index // size
+            neighbors = tuple(ny * size + nx
+                              for ny in range(max(0, y - 2), min(size, y + 3))
+                              for nx in range(max(0, x - 2), min(size, x + 3))
+                              if nx != x or ny != y)
+            self._neighbor_cache[index] = neighbors
+        return neighbors
+    
+    def get_candidate_moves(self):
+        """获取周围2格内有棋子的所有空位"""
+        size = self.board_size
+        return [(i % size, i // size) for i in self.candidates]
+    
+    def score_move_delta(self, x, y, player):
+        """不改动棋盘，计算在空位 (x, y) 落子带来的评估分数变化，返回 (attack, defence)"""
+        counts = self._window_counts[player]
+        opponent_counts = self._window_counts[3 - player]
+        attack = 0
+        defence = 0
+        
+        for w in self._windows_at(y * self.board_size + x):
+            own = counts.get(w, 0)
+            other = opponent_counts.get(w, 0)
+            attack += LINE_SCORES[own + 1][other] - LINE_SCORES[own][other]
+            defence += LINE_SCORES[other + 1][own] - LINE_SCORES[other][own]
+        
+        return attack, defence
+    
+    def get_threat_moves(self, player, stones):
+        """获取位于“player 有 stones 子且无对手棋子”的窗口中的所有空位"""
+        cells = self.cells
+        coords = self._coords
+        moves = set()
+        for w in self._pure[player][stones]:
+            for i in self._window_cells(w):
+                if i not in cells:
+                    moves.add(coords[i])
+        return moves
+    
+    def count_threat_windows(self, x, y, player, stones):
+        """统计经过 (x, y) 且 player 恰有 stones 子、没有对手棋子的窗口数"""
+        pure = self._pure[player][stones]
+        return sum(1 for w in self._windows_at(y * self.board_size + x) if w in pure)
+    
+    def check_win(self, x, y, player):
+        """检查指定玩家是否在指定位置获胜"""
+        cells = self.cells
+        size = self.board_size
+        for dx, dy in DIRECTIONS:
+            count = 1  # 当前位置已经有一个棋子
+            for sx, sy in ((dx, dy), (-dx, -dy)):
+                nx, ny = x + sx, y + sy
+                for _ in range(4):
+                    if not (0 <= nx < size and 0 <= ny < size) or cells.get(ny * size + nx) != player:
+                        break
+                    count += 1
+                    nx += sx
+                    ny += sy
+            if count >= 5:
+                return True
+        return False
+    
+    def is_board_full(self):
+        """检查棋盘是否已满"""
+        return len(self.cells) == self.board_size * self.board_size
+    
+    def get_valid_moves(self):
+        """已有棋子周围2格内的空位；空棋盘时只返回中心"""
+        if not self.cells:
+            center = self.board_size // 2
+            return [(center, center)]
+        return self.get_candidate_moves()
+    
+    def bounding_box(self):
+        """所有棋子的外接矩形 (min_x, min_y, max_x, max_y)，没有棋子时返回 None"""
+        if not self.cells:
+            return None
+        size = self.board_size
+        xs = [i % size for i in self.cells]
+        ys = [i // size for i in self.cells]
+        return min(xs), min(ys), max(xs), max(ys)
+    
+    def get_board_state(self):
+        """获取当前棋子的副本 {(x, y): 玩家}"""
+        coords = self._coords
+        return {coords[i]: player for i, player in self.cells.items()}
+    
+    def evaluate_position(self, player):
+        """评估当前棋盘对指定玩家的有利程度（增量维护，O(1)）"""
+        return self._scores[player]
+    
+    def evaluate_position_full(self, player):
+        """由所有有棋子的窗口重新计算评估分数（用于校验）"""
+        counts = self._window_counts[player]
+        opponent_counts = self._window_counts[3 - player]
+        return sum(LINE_SCORES[counts.get(w, 0)][opponent_counts.get(w, 0)]
+                   for w in counts.keys() | opponent_counts.keys())
@@ -0,0 +1,118 @@
+"""启动时间测量
+
+每次都用新的解释器进程启动，测量从启动进程到各阶段完成的时间（毫秒）：
+    engine    导入引擎模块（imports），创建 Game、打开开局库并创建 AI（engine）
+    headless  pbrain.py 回复 START 15 的 OK（ready），即命令行引擎可以开始对局
+    desktop   main.py 导入界面模块（imports）、画出第一帧（first_frame）、
+              在后台载入引擎完成（engine_ready）；需要 Kivy 和图形环境
+第一次运行会生成 .pyc，结果按多次运行的最小值和中位数给出。--no-tables 不读取
+预计算的表文件（tables.py），用于比较打包预计算表前后的差别。
+
+用法：
+    python startup.py [engine headless desktop] [--runs 5] [--no-tables]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ENGINE_SCRIPT = """
+import time
+import game, ai, book
+print('STARTUP imports', time.time(), flush=True)
+g = game.Game(15)
+ai.AI(g, difficulty=3, book=book.OpeningBook.open_default())
+print('STARTUP engine', time.time(), flush=True)
+"""
+
+# 单次启动的时间上限(秒)
+TIMEOUT = 60
+
+
+def _traced_run(args, env):
+    """运行打印 STARTUP <阶段> <时间> 的子进程，返回 {阶段: 距启动的毫秒数}"""
+    start = time.time()
+    result = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=TIMEOUT)
+    phases = {}
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[0] == 'STARTUP':
+            phases[parts[1]] = (float(parts[2]) - start) * 1000
+    if result.returncode != 0 or not phases:
+        raise RuntimeError(f"{' '.join(args)} 失败：\n{result.stderr.strip()}")
+    return phases
+
+
+def measure_engine(env):
+    return _traced_run([sys.executable, '-c', ENGINE_SCRIPT], env)
+
+
+def measure_headless(env):
+    start = time.time()
+    process = subprocess.Popen([sys.executable, 'pbrain.py'], cwd=ROOT, env=env, text=True,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        process.stdin.write('START 15\n')
+        process.stdin.flush()
+        reply = process.stdout.readline().strip()
+        ready = (time.time() - start) * 1000
+        process.stdin.write('END\n')
+        process.stdin.flush()
+        process.wait(TIMEOUT)
+    finally:
+        if process.poll() is None:
+            process.kill()
+    if reply != 'OK':
+        raise RuntimeError(f"pbrain.py 对 START 的回复为 {reply!r}")
+    return {'ready': ready}
+
+
+def measure_desktop(env):
+    env = dict(env, WUZIQI_STARTUP_TRACE='1')
+    return _traced_run([sys.executable, 'main.py'], env)
+
+
+MODES = {
+    'engine': measure_engine,
+    'headless': measure_headless,
+    'desktop': measure_desktop,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量冷启动时间')
+    parser.add_argument('modes', nargs='*', metavar='mode',
+                        help=f"{'、'.join(MODES)} 中的一个或多个（默认 engine headless）")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--no-tables', action='store_true', help='不读取预计算的表文件')
+    args = parser.parse_args()
+    modes = args.modes or ['engine', 'headless']
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"未知的模式 {mode}")
+    
+    env = dict(os.environ)
+    if args.no_tables:
+        env['WUZIQI_NO_TABLES'] = '1'
+    
+    for mode in modes:
+        runs = []
+        try:
+            for _ in range(args.runs):
+                runs.append(MODES[mode](env))
+        except (RuntimeError, OSError, subprocess.TimeoutExpired) as error:
+            print(f"{mode}: 无法测量（{error}）")
+            continue
+        for phase in runs[0]:
+            values = [run[phase] for run in runs if phase in run]
+            print(f"{mode:<9} {phase:<13} 最小 {min(values):8.1f} ms"
+                  f"  中位数 {statistics.median(values):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
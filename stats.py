@@ -0,0 +1,106 @@
+"""搜索统计
+
+AI 在 collect_stats=True 时把每次搜索的统计记录在 SearchStats 中，
+关闭时搜索只多做几次 `is not None` 判断。
+"""
+
+
+class SearchStats:
+    """一次搜索的统计数据
+    
+    计数器在搜索过程中由 AI 累加；iterations 在每轮迭代完成时追加一条
+    (深度, 最佳移动, 分数, 分数是否精确, 累计节点数, 累计用时)。
+    """
+    
+    # cutoff_index 中单独统计的走法序号个数，更靠后的剪枝合并到最后一格
+    MAX_CUTOFF_INDEX = 8
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.source = None        # 走法来源：'book'、'opening'、'threat' 或 'search'
+        self.nodes = 0            # 全宽搜索节点数
+        self.threat_nodes = 0     # 威胁空间搜索节点数
+        self.evaluations = 0      # 叶子节点静态评估次数
+        self.cutoffs = 0          # Alpha-Beta 剪枝次数
+        # 按引起剪枝的走法在排序中的位置计数，第一个走法就剪枝的比例越高说明排序越好
+        self.cutoff_index = [0] * self.MAX_CUTOFF_INDEX
+        self.tt_probes = 0        # 置换表查询次数
+        self.tt_hits = 0          # 查到条目的次数
+        self.tt_cutoffs = 0       # 直接用置换表分数返回的次数
+        self.depth = 0            # 完成的最大深度
+        self.score = 0            # 最佳走法的分数
+        self.move = None          # 选出的走法
+        self.pv = []              # 主要变例
+        self.iterations = []
+        self.elapsed = 0.0        # 总用时(秒)
+    
+    def record_cutoff(self, index):
+        self.cutoffs += 1
+        self.cutoff_index[min(index, self.MAX_CUTOFF_INDEX - 1)] += 1
+    
+    def merge(self, other):
+        """累加另一份统计的计数器（多进程搜索时合并各进程的结果）"""
+        self.nodes += other.nodes
+        self.threat_nodes += other.threat_nodes
+        self.evaluations += other.evaluations
+        self.cutoffs += other.cutoffs
+        for index, count in enumerate(other.cutoff_index):
+            self.cutoff_index[index] += count
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+        self.tt_cutoffs += other.tt_cutoffs
+    
+    @property
+    def first_move_cutoff_rate(self):
+        """第一个走法就引起剪枝的比例"""
+        return self.cutoff_index[0] / self.cutoffs if self.cutoffs else 0.0
+    
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+    
+    @property
+    def nps(self):
+        """每秒节点数"""
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def as_dict(self):
+        return {
+            'source': self.source,
+            'move': self.move,
+            'score': self.score,
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'threat_nodes': self.threat_nodes,
+            'evaluations': self.evaluations,
+            'cutoffs': self.cutoffs,
+            'cutoff_index': list(self.cutoff_index),
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_cutoffs': self.tt_cutoffs,
+            'pv': list(self.pv),
+            'iterations': list(self.iterations),
+            'elapsed': self.elapsed,
+        }
+    
+    def summary(self):
+        """多行的简短文字说明，用于界面上的调试信息"""
+        # 搜索进行中 source 还是 None，只要有完成的迭代就显示深度和节点
+        source = self.source or '搜索中'
+        lines = [f"来源 {source}  走法 {self.move}  分数 {self.score:g}"]
+        if self.source == 'search' or self.iterations:
+            lines.append(f"深度 {self.depth}  节点 {self.nodes}  {self.nps:.0f}/秒")
+            lines.append(f"评估 {self.evaluations}  剪枝 {self.cutoffs} "
+                         f"(首个 {self.first_move_cutoff_rate:.0%})")
+            lines.append(f"置换表 命中 {self.tt_hit_rate:.0%}  截断 {self.tt_cutoffs}")
+            times = ' '.join(f"{iteration[0]}:{iteration[5] * 1000:.0f}ms"
+                             for iteration in self.iterations)
+            lines.append(f"迭代 {times}")
+        if self.threat_nodes:
+            lines.append(f"威胁搜索节点 {self.threat_nodes}")
+        if self.pv:
+            lines.append("变例 " + ' '.join(f"{x},{y}" for x, y in self.pv))
+        lines.append(f"用时 {self.elapsed:.2f} 秒")
+        return '\n'.join(lines)
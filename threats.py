@@ -0,0 +1,161 @@
+"""威胁空间搜索：连续冲四（VCF）与连续冲四活三（VCT）
+
+只考虑形成或阻挡冲四、活三的走法，用很小的代价找出全宽搜索看不到的必胜序列。
+"""
+import time
+
+# 横、竖、两条斜线
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+class ThreatBudgetExceeded(Exception):
+    """威胁搜索的节点数或时间用尽"""
+
+
+class ThreatSearch:
+    """在给定的 Game 上搜索 player 的强制取胜序列
+    
+    搜索会临时落子并在返回前全部撤销，不会改变棋盘。
+    """
+    
+    def __init__(self, game, max_nodes=20000, time_limit=0.5):
+        self.game = game
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.nodes = 0
+        self.total_nodes = 0  # 所有 find_win 调用累计的节点数
+        self.stopped = False  # 由其他线程置为 True 时尽快结束搜索
+        self._deadline = float('inf')
+        self._failed = {}  # 已证明无法取胜的局面：哈希 -> 搜索深度
+    
+    def find_win(self, player, vct=False, max_depth=None):
+        """寻找 player 先手的必胜序列
+        
+        vct=False 时只用冲四（VCF），True 时同时使用活三（VCT）。
+        找到时返回 [攻方走法, 守方应对, 攻方走法, ...]，否则返回 None。
+        max_depth 为攻方最多走的步数。
+        """
+        if max_depth is None:
+            max_depth = 6 if vct else 12
+        self.nodes = 0
+        self._deadline = time.time() + self.time_limit
+        self._failed = {}
+        root_ply = len(self.game.history)
+        
+        try:
+            return self._attack(player, vct, max_depth)
+        except ThreatBudgetExceeded:
+            while len(self.game.history) > root_ply:
+                self.game.undo_move()
+            return None
+        finally:
+            self.total_nodes += self.nodes
+    
+    def _attack(self, player, vct, depth):
+        """攻方走棋，返回必胜序列或 None"""
+        game = self.game
+        opponent = 3 - player
+        self.nodes += 1
+        if self.nodes > self.max_nodes or self.stopped or time.time() > self._deadline:
+            raise ThreatBudgetExceeded()
+        
+        # 直接成五
+        wins = game.get_threat_moves(player, 4)
+        if wins:
+            return [min(wins)]
+        if depth == 0:
+            return None
+        
+        key = game.hash
+        if self._failed.get(key, -1) >= depth:
+            return None
+        
+        # 对手已有冲四时只能去挡，且挡的这一手必须同时形成威胁
+        opponent_wins = game.get_threat_moves(opponent, 4)
+        if len(opponent_wins) > 1:
+            candidates = []
+        elif opponent_wins:
+            candidates = list(opponent_wins)
+        else:
+            candidates = self._threat_candidates(player, vct)
+        
+        for x, y in candidates:
+            game.make_move(x, y, player)
+            if game.count_threat_windows(x, y, player, 4):
+                line = self._defend(player, vct, depth)
+            elif (vct and game.count_threat_windows(x, y, player, 3) >= 2
+                  and self._threatens_open_four(x, y, player)):
+                line = self._defend(player, vct, depth)
+            else:
+                line = None
+            game.undo_move()
+            if line is not None:
+                return [(x, y)] + line
+        
+        self._failed[key] = depth
+        return None
+    
+    def _threatens_open_four(self, x, y, player):
+        """刚下在 (x, y) 的棋子是否形成活三
+        
+        两个眠三也能凑出两个三子窗口，但对方可以不理。这里要求同一条线上存在
+        一个冲四点，下在那里之后出现两个成五点（活四或双冲四），对方才必须应对。
+        """
+        game = self.game
+        four_points = game.get_threat_moves(player, 3)
+        for dx, dy in DIRECTIONS:
+            for step in (-4, -3, -2, -1, 1, 2, 3, 4):
+                move = (x + dx * step, y + dy * step)
+                if move not in four_points:
+                    continue
+                game.make_move(move[0], move[1], player)
+                open_four = len(game.get_threat_moves(player, 4)) >= 2
+                game.undo_move()
+                if open_four:
+                    return True
+        return False
+    
+    def _threat_candidates(self, player, vct):
+        """攻方候选：先冲四点，再（VCT 时）成三点，各自按进攻增益排序"""
+        game = self.game
+        fours = game.get_threat_moves(player, 3)
+        
+        def gain(move):
+            return game.score_move_delta(move[0], move[1], player)[0]
+        
+        candidates = sorted(fours, key=gain, reverse=True)
+        if vct:
+            threes = game.get_threat_moves(player, 2) - fours
+            candidates.extend(sorted(threes, key=gain, reverse=True))
+        return candidates
+    
+    def _defend(self, player, vct, depth):
+        """守方应对攻方刚下出的威胁，所有应对都失败时返回必胜序列"""
+        game = self.game
+        defender = 3 - player
+        
+        # 守方可以直接成五
+        if game.get_threat_moves(defender, 4):
+            return None
+        
+        wins = game.get_threat_moves(player, 4)
+        if len(wins) > 1:
+            # 活四或双冲四，挡不住
+            move = min(wins)
+            return [move, min(wins - {move})]
+        if wins:
+            replies = wins
+        else:
+            # 活三：挡住能成四的点，或者用自己的冲四反击
+            replies = game.get_threat_moves(player, 3) | game.get_threat_moves(defender, 3)
+        
+        best_line = None
+        for x, y in sorted(replies):
+            game.make_move(x, y, defender)
+            line = self._attack(player, vct, depth - 1)
+            game.undo_move()
+            if line is None:
+                return None
+            if best_line is None or len(line) > len(best_line):
+                best_line = [(x, y)] + line
+        return best_line
@@ -0,0 +1,66 @@
+from array import array
+
+# 置换表条目的边界类型
+EXACT = 0  # 精确值
+LOWER = 1  # 下界（发生Beta剪枝）
+UPPER = 2  # 上界（所有走法都不超过Alpha）
+
+# 每个条目占用的字节数：哈希(8) + 分数(8) + 最佳走法(2) + 深度(1) + 类型(1) + 代数(1)
+ENTRY_BYTES = 21
+# 格子数超过这个值时（大棋盘、稀疏棋盘），最佳走法改用4字节保存
+SHORT_MOVE_CELLS = 0x8000
+
+
+class TranspositionTable:
+    """固定大小的置换表
+    
+    条目保存在几个紧凑的 array 中，总内存由 size_mb 限定，适合内存有限的手机。
+    替换策略以深度优先：同一局面总是覆盖；不同局面只有在新条目深度不小于旧条目，
+    或旧条目来自之前的搜索时才会覆盖。
+    """
+    
+    def __init__(self, size_mb=8, cells=SHORT_MOVE_CELLS):
+        # cells 为棋盘格子数，决定最佳走法（格子编号）用2字节还是4字节保存
+        self.move_type = 'h' if cells <= SHORT_MOVE_CELLS else 'i'
+        entry_bytes = ENTRY_BYTES - 2 + array(self.move_type).itemsize
+        self.capacity = max(1, int(size_mb * 1024 * 1024) // entry_bytes)
+        self.generation = 0
+        self.clear()
+    
+    def clear(self):
+        """清空所有条目"""
+        n = self.capacity
+        # 用重复一个元素的方式创建数组，不经过临时的 bytes 对象，启动时更快
+        self.keys = array('Q', [0]) * n
+        self.scores = array('d', [0.0]) * n
+        self.moves = array(self.move_type, [-1]) * n
+        self.depths = array('b', [-1]) * n
+        self.flags = array('B', [0]) * n
+        self.generations = array('B', [0]) * n
+        self.generation = 0
+    
+    def new_search(self):
+        """开始新一次搜索，之前搜索留下的条目变为可优先替换"""
+        self.generation = (self.generation + 1) & 0xFF
+    
+    def probe(self, key):
+        """查找局面，命中时返回 (depth, flag, score, move)，否则返回 None"""
+        i = key % self.capacity
+        if self.keys[i] == key and self.depths[i] >= 0:
+            return self.depths[i], self.flags[i], self.scores[i], self.moves[i]
+        return None
+    
+    def store(self, key, depth, flag, score, move=-1):
+        """写入一个条目，move 为格子编号 y * board_size + x，没有时为 -1"""
+        i = key % self.capacity
+        if (self.keys[i] != key and self.depths[i] > depth and
+                self.generations[i] == self.generation):
+            return
+        if move < 0 and self.keys[i] == key:
+            move = self.moves[i]  # 保留同一局面之前记录的最佳走法
+        self.keys[i] = key
+        self.depths[i] = min(depth, 127)
+        self.flags[i] = flag
+        self.scores[i] = score
+        self.moves[i] = move
+        self.generations[i] = self.generation
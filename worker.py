@@ -0,0 +1,106 @@
+import threading
+
+
+class SearchWorker:
+    """在后台线程中运行 AI 搜索
+    
+    每次搜索都在 Game 的副本上进行，不会改动界面正在绘制的棋盘。
+    不依赖 Kivy，结果通过回调在工作线程中交给调用方。
+    
+    也支持后台思考（ponder）：AI落子后假设对手会下出主要变例中的应对，
+    提前开始搜索；对手确实这样下时调用 ponder_hit() 继续这次搜索，
+    否则重新 start()，后台思考的结果被丢弃，但置换表中的条目保留。
+    """
+    
+    def __init__(self, ai):
+        self.ai = ai
+        self.generation = 0  # 每次开始或取消搜索都会加一，旧搜索的结果据此丢弃
+        self.ponder_move = None  # 后台思考所假设的对手走法
+        self._lock = threading.Lock()  # 保证同一时间只有一个线程使用 AI
+        self._state_lock = threading.Lock()  # 保护后台思考的状态
+        self._thread = None
+        self._callback = None
+        self._ponder_result = None
+    
+    def start(self, game, callback, ponder_move=None):
+        """在 game 的副本上开始搜索，返回本次搜索的编号
+        
+        搜索完成且没有被取消时，在工作线程中调用 callback(move, generation)。
+        ponder_move 不为 None 时进行后台思考：先在副本上替对手下出
+        ponder_move 再搜索，不计时，结果要等到 ponder_hit() 之后才回调。
+        """
+        self.cancel()
+        generation = self.generation
+        search_game = game.copy()
+        if ponder_move is not None:
+            search_game.make_move(ponder_move[0], ponder_move[1], self.ai.opponent)
+        with self._state_lock:
+            self.ponder_move = ponder_move
+            self._ponder_result = None
+            self._callback = callback
+        
+        def run():
+            with self._lock:
+                # 先清除停止标志再检查编号：cancel() 总是先改编号再停止，
+                # 因此任何时刻的取消都不会被漏掉
+                self.ai.stopped = False
+                with self._state_lock:
+                    if generation != self.generation:
+                        return
+                    # 取得 _lock 之后才改 pondering，被取消但还没退出的上一次搜索不会读到它；
+                    # ponder_hit() 先在 _state_lock 中清除 ponder_move 再通知 AI，不会被这里覆盖
+                    self.ai.pondering = self.ponder_move is not None
+                self.ai.game = search_game
+                move = self.ai.make_move()
+            self._finish(move, generation)
+        
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return generation
+    
+    def _finish(self, move, generation):
+        with self._state_lock:
+            if generation != self.generation:
+                return
+            if self.ponder_move is not None:
+                # 后台思考提前完成，等对手落子后再交出结果
+                self._ponder_result = move
+                return
+            callback = self._callback
+        callback(move, generation)
+    
+    def ponder_hit(self):
+        """对手下出了预测的走法：后台思考转为正式搜索，返回搜索编号"""
+        with self._state_lock:
+            self.ponder_move = None
+            move = self._ponder_result
+            self._ponder_result = None
+            callback = self._callback
+            generation = self.generation
+        # 后台思考已经完成时也通知 AI，以便补发思考期间没有回调的统计
+        self.ai.ponder_hit()
+        if move is not None:
+            callback(move, generation)
+        return generation
+    
+    def cancel(self):
+        """取消正在进行的搜索，已经算出的结果也不再回调"""
+        with self._state_lock:
+            self.generation += 1
+            self.ponder_move = None
+            self._ponder_result = None
+        self.ai.stop()
+    
+    def reset(self):
+        """取消搜索，等搜索线程放开 AI 之后再清空置换表和历史得分（新开一局时调用）
+        
+        cancel() 只是请求停止，搜索线程可能还在使用置换表和历史得分，
+        因此必须先取得 _lock 再调用 ai.reset()。
+        """
+        self.cancel()
+        with self._lock:
+            self.ai.reset()
+    
+    def is_busy(self):
+        """是否有搜索线程仍在运行"""
+        return self._thread is not None and self._thread.is_alive()